@@ -9,28 +9,43 @@ from .ai import (  # noqa: F401
     ask_openai_for_amendments,
     ask_openai_for_commits,
     ask_openai_for_fix,
+    compress_diff,
     get_openai_client,
     parse_json_from_openai_response,
+    poll_fix_batch,
+    start_fix_batch,
 )
 from .cli import cli, main
 from .config import __version__
 from .git import (  # noqa: F401
     apply_commits,
     apply_fix_plan,
+    clear_diff_cache,
+    clear_git_cache,
     get_changed_files,
     get_commits_for_fix,
     get_commits_since_push,
     get_current_branch,
     get_diff,
+    get_diff_by_file,
+    get_git_dir,
+    get_status,
     get_unpushed_commits,
     get_untracked_files,
     get_upstream_ref,
     is_git_ignored,
     is_tracked,
+    is_worktree_clean,
+    iter_commits_since_push,
+    print_commit_log,
+    read_commit,
+    resolve_rev,
     rewrite_commits,
     run,
+    run_parallel,
+    stream_records,
 )
-from .ui import display_spinning_animation, format_commit_preview  # noqa: F401
+from .ui import display_spinning_animation, format_commit_preview, spinner  # noqa: F401
 from .validation import lint_commit_dict, lint_git_commit_subject  # noqa: F401
 from .watcher import ChangeHandler  # noqa: F401
 
@@ -42,7 +57,7 @@ def get_origin_repo_slug():
     """Extract the owner/repo slug from the origin remote URL."""
     from urllib.parse import urlparse
 
-    url = run("git config --get remote.origin.url")
+    url = run(["git", "config", "--get", "remote.origin.url"])
     if url.startswith("git@"):
         _, path = url.split(":", 1)
     elif url.startswith("https://") or url.startswith("http://"):
@@ -71,31 +86,47 @@ __all__ = [
     "main",
     # Git
     "run",
+    "run_parallel",
+    "stream_records",
+    "clear_git_cache",
     "get_upstream_ref",
     "get_current_branch",
+    "get_git_dir",
     "get_origin_repo_slug",
     "is_tracked",
+    "is_worktree_clean",
+    "read_commit",
+    "resolve_rev",
     "is_git_ignored",
     "get_untracked_files",
     "get_changed_files",
     "get_diff",
+    "get_diff_by_file",
+    "clear_diff_cache",
+    "get_status",
     "get_commits_since_push",
+    "iter_commits_since_push",
     "get_unpushed_commits",
     "get_commits_for_fix",
     "apply_fix_plan",
     "apply_commits",
+    "print_commit_log",
     "rewrite_commits",
     # AI
     "get_openai_client",
     "parse_json_from_openai_response",
+    "compress_diff",
     "ask_openai_for_commits",
     "ask_openai_for_amendments",
     "ask_openai_for_fix",
+    "start_fix_batch",
+    "poll_fix_batch",
     # Validation/UI
     "lint_commit_dict",
     "lint_git_commit_subject",
     "display_spinning_animation",
     "format_commit_preview",
+    "spinner",
     # Watcher
     "ChangeHandler",
 ]
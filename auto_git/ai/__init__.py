@@ -1,12 +1,22 @@
 """AI integration package."""
 
 from .client import get_openai_client, parse_json_from_openai_response
-from .commits import ask_openai_for_amendments, ask_openai_for_commits, ask_openai_for_fix
+from .commits import (
+    ask_openai_for_amendments,
+    ask_openai_for_commits,
+    ask_openai_for_fix,
+    poll_fix_batch,
+    start_fix_batch,
+)
+from .diffs import compress_diff
 
 __all__ = [
     "get_openai_client",
     "parse_json_from_openai_response",
+    "compress_diff",
     "ask_openai_for_commits",
     "ask_openai_for_amendments",
     "ask_openai_for_fix",
+    "start_fix_batch",
+    "poll_fix_batch",
 ]
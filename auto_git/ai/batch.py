@@ -0,0 +1,97 @@
+"""OpenAI Batch API helpers for non-interactive, half-price requests."""
+
+import json
+import time
+
+from ..config import BATCH_POLL_SECONDS, OPENAI_TEMPERATURE
+
+BATCH_ENDPOINT = "/v1/responses"
+_TERMINAL_FAILURES = ("failed", "expired", "cancelled")
+
+
+class BatchFailedError(RuntimeError):
+    """Raised when a batch ended without a usable answer; polling again won't help."""
+
+
+def build_batch_jsonl(requests, text_format=None):
+    """Encode `(custom_id, model, prompt)` tuples as a Batch API input file."""
+    extra = {"text": {"format": text_format}} if text_format else {}
+    lines = [
+        json.dumps(
+            {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": model,
+                    "input": prompt,
+                    "temperature": OPENAI_TEMPERATURE,
+                    **extra,
+                },
+            }
+        )
+        for custom_id, model, prompt in requests
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def submit_batch(client, requests, text_format=None):
+    """Upload `requests` and start a batch; return the batch id."""
+    upload = client.files.create(
+        file=("auto-git-batch.jsonl", build_batch_jsonl(requests, text_format)), purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=upload.id, endpoint=BATCH_ENDPOINT, completion_window="24h"
+    )
+    return batch.id
+
+
+def check_batch(client, batch_id):
+    """
+    Return the batch if it has completed, or None while it is still running.
+
+    Raises BatchFailedError if the batch failed, expired or was cancelled.
+    """
+    batch = client.batches.retrieve(batch_id)
+    if batch.status == "completed":
+        return batch
+    if batch.status in _TERMINAL_FAILURES:
+        raise BatchFailedError(f"OpenAI batch {batch_id} ended with status {batch.status}")
+    return None
+
+
+def wait_for_batch(client, batch_id, poll_seconds=BATCH_POLL_SECONDS):
+    """Poll until the batch finishes; raise BatchFailedError if it did not complete."""
+    while True:
+        batch = check_batch(client, batch_id)
+        if batch is not None:
+            return batch
+        time.sleep(poll_seconds)
+
+
+def _output_text(body):
+    """Concatenate the output_text parts of a Responses API response body."""
+    return "".join(
+        part.get("text", "")
+        for item in body.get("output") or []
+        if item.get("type") == "message"
+        for part in item.get("content") or []
+        if part.get("type") == "output_text"
+    )
+
+
+def read_batch_output(client, batch):
+    """Return `{custom_id: output_text}` for a completed batch."""
+    if not batch.output_file_id:
+        raise BatchFailedError(f"OpenAI batch {batch.id} produced no output")
+    results = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            error = record.get("error") or response.get("body", {}).get("error")
+            raise BatchFailedError(f"OpenAI batch request {record.get('custom_id')} failed: {error}")
+        results[record["custom_id"]] = _output_text(response.get("body") or {})
+    return results
@@ -0,0 +1,128 @@
+"""
+On-disk cache of raw OpenAI responses keyed by model and prompt, plus the
+per-file commit classifications reused by `ask_openai_for_commits`.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from ..config import (
+    FILE_PLAN_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+
+_FILE_PLANS_NAME = "file-plans.json"
+
+_enabled = True
+
+
+def get_cache_dir():
+    """Return the directory holding cached responses (honours XDG_CACHE_HOME)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "auto-git" / "responses"
+
+
+def set_enabled(enabled):
+    """Turn lookups and stores on or off for this process (`--no-cache`)."""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def clear():
+    """Delete every cached response and file plan; return how many files were removed."""
+    removed = 0
+    cache_dir = get_cache_dir()
+    for path in [*cache_dir.glob("*.txt"), cache_dir / _FILE_PLANS_NAME]:
+        try:
+            path.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def make_key(model, prompt):
+    """Build a cache key from the model name and the full prompt text."""
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def get(key):
+    """Return the cached response text for `key`, or None on a miss or expiry."""
+    if not _enabled:
+        return None
+    path = get_cache_dir() / f"{key}.txt"
+    try:
+        written = path.stat().st_mtime
+        if time.time() - written > RESPONSE_CACHE_TTL_SECONDS:
+            path.unlink(missing_ok=True)
+            return None
+        text = path.read_text(encoding="utf-8")
+        # mtime records when the entry was written (for the TTL); atime records
+        # the last hit so eviction drops the least recently used entries first.
+        os.utime(path, (time.time(), written))
+    except OSError:
+        return None
+    return text
+
+
+def put(key, text):
+    """Store response text for `key`, evicting the oldest entries past the limit."""
+    if not _enabled:
+        return
+    cache_dir = get_cache_dir()
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_dir / f"{key}.tmp"
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, cache_dir / f"{key}.txt")
+        entries = sorted(cache_dir.glob("*.txt"), key=lambda p: p.stat().st_atime)
+        for stale in entries[:-RESPONSE_CACHE_MAX_ENTRIES]:
+            stale.unlink(missing_ok=True)
+    except OSError:
+        # Caching is best-effort; never fail the caller over it.
+        pass
+
+
+def _load_file_plans():
+    try:
+        with open(get_cache_dir() / _FILE_PLANS_NAME, encoding="utf-8") as fh:
+            plans = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    now = time.time()
+    return {
+        key: entry
+        for key, entry in plans.items()
+        if now - entry.get("created", 0) <= RESPONSE_CACHE_TTL_SECONDS
+    }
+
+
+def get_file_plans(keys):
+    """Return `{key: plan}` for the per-file plans stored under any of `keys`."""
+    if not _enabled:
+        return {}
+    plans = _load_file_plans()
+    return {key: plans[key]["plan"] for key in keys if key in plans}
+
+
+def put_file_plans(new_plans):
+    """Remember `{key: plan}` per-file plans, keeping only the newest entries."""
+    if not _enabled or not new_plans:
+        return
+    plans = _load_file_plans()
+    now = time.time()
+    plans.update({key: {"created": now, "plan": plan} for key, plan in new_plans.items()})
+    newest = sorted(plans.items(), key=lambda item: item[1]["created"])
+    plans = dict(newest[-FILE_PLAN_CACHE_MAX_ENTRIES:])
+    cache_dir = get_cache_dir()
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_dir / f"{_FILE_PLANS_NAME}.{os.getpid()}.tmp"
+        tmp_path.write_text(json.dumps(plans), encoding="utf-8")
+        os.replace(tmp_path, cache_dir / _FILE_PLANS_NAME)
+    except OSError:
+        pass
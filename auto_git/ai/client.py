@@ -3,35 +3,57 @@
 import json
 import os
 import re
+from functools import lru_cache
 
 import openai
 
+from ..config import OPENAI_TEMPERATURE
+
+
+@lru_cache(maxsize=1)
+def _client_for_key(api_key):
+    # Reusing one client keeps its connection pool (and TLS sessions) warm
+    # across calls, which matters in the long-running watch loop.
+    return openai.OpenAI(api_key=api_key)
+
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*([\s\S]*?)\s*```", re.IGNORECASE)
+_JSON_START_RE = re.compile(r"[\[{]")
+_DECODER = json.JSONDecoder()
+
+_ENV_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", ".env")
+# One `KEY=VALUE` assignment per line; blank and `#` comment lines never match.
+_ENV_LINE_RE = re.compile(r"^[ \t]*([^#=\s][^=\n]*?)[ \t]*=(.*)$", re.MULTILINE)
+
+
+@lru_cache(maxsize=1)
+def _load_env_file(path=_ENV_PATH):
+    """Parse KEY=VALUE lines from a .env file once; missing files yield {}."""
+    values = {}
+    if not os.path.exists(path):
+        return values
+    with open(path, "r") as env_file:
+        text = env_file.read()
+    for match in _ENV_LINE_RE.finditer(text):
+        key, value = match.groups()
+        values.setdefault(key, value.strip().strip('"').strip("'"))
+    return values
+
 
 def get_openai_client():
     """
     Get an OpenAI client, reading API key from environment or .env file.
 
+    The client is reused across calls for as long as the API key is unchanged.
+
     Raises RuntimeError if no API key is found.
     """
-    api_key = os.environ.get("OPEN_AI_API_KEY")
-
-    if not api_key:
-        env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", ".env")
-        if os.path.exists(env_path):
-            with open(env_path, "r") as env_file:
-                for line in env_file:
-                    line = line.strip()
-                    if not line or line.startswith("#") or "=" not in line:
-                        continue
-                    key, value = line.split("=", 1)
-                    if key.strip() == "OPEN_AI_API_KEY":
-                        api_key = value.strip().strip('"').strip("'")
-                        break
+    api_key = os.environ.get("OPEN_AI_API_KEY") or _load_env_file().get("OPEN_AI_API_KEY")
 
     if not api_key:
         raise RuntimeError("OPEN_AI_API_KEY is not set in the environment or .env file")
 
-    return openai.OpenAI(api_key=api_key)
+    return _client_for_key(api_key)
 
 
 def parse_json_from_openai_response(text):
@@ -47,15 +69,69 @@ def parse_json_from_openai_response(text):
     stripped = (text or "").strip()
 
     # If the response contains a fenced code block, prefer its contents.
-    m = re.search(r"```(?:json)?\s*([\s\S]*?)\s*```", stripped, flags=re.IGNORECASE)
+    m = _FENCE_RE.search(stripped)
     if m:
         stripped = m.group(1).strip()
 
-    # Trim any leading prose before the first JSON token.
-    starts = [i for i in (stripped.find("["), stripped.find("{")) if i != -1]
-    if starts:
-        stripped = stripped[min(starts) :]
-
-    # Parse the first JSON value and ignore any trailing noise.
-    obj, _end = json.JSONDecoder().raw_decode(stripped)
+    # Trim any leading prose before the first JSON token, then parse the first
+    # JSON value and ignore any trailing noise.
+    start = _JSON_START_RE.search(stripped)
+    obj, _end = _DECODER.raw_decode(stripped, start.start() if start else 0)
     return obj
+
+
+def stream_response_text(client, model, prompt, text_format=None):
+    """
+    Stream a Responses API call, yielding output text deltas as they arrive.
+
+    `text_format` is passed as the response's `text.format` (e.g. a strict
+    JSON schema). Raises RuntimeError if the API reports a failure mid-stream.
+    """
+    kwargs = {"text": {"format": text_format}} if text_format else {}
+    with client.responses.create(
+        model=model, input=prompt, temperature=OPENAI_TEMPERATURE, stream=True, **kwargs
+    ) as stream:
+        for event in stream:
+            if event.type == "response.output_text.delta":
+                yield event.delta
+            elif event.type in ("error", "response.failed"):
+                error = getattr(getattr(event, "response", None), "error", None) or event
+                raise RuntimeError(f"OpenAI response failed: {getattr(error, 'message', error)}")
+
+
+def iter_json_array_items(chunks):
+    """
+    Incrementally parse the first JSON array found in a stream of text chunks.
+
+    Each array element is yielded as soon as it is complete, so callers can
+    validate early entries while the rest of the response is still arriving.
+    Leading prose and code fences before the array are skipped. All chunks are
+    consumed even after the array closes.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = None
+    done = False
+    for chunk in chunks:
+        buf += chunk
+        if done:
+            continue
+        if pos is None:
+            start = buf.find("[")
+            if start == -1:
+                continue
+            pos = start + 1
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if buf[pos] == "]":
+                done = True
+                break
+            try:
+                item, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Element still incomplete; wait for more text.
+                break
+            yield item
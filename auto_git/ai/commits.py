@@ -1,18 +1,201 @@
 """AI commit generation and parsing."""
 
 import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 
-from ..config import OPENAI_MODEL_COMMITS
-from ..ui import display_spinning_animation
+from ..config import (
+    AMENDMENT_CHUNK_SIZE,
+    COMMIT_PROMPT_MAX_TOKENS,
+    FIX_FULL_DIFF_MAX_CHARS,
+    OPENAI_MAX_CONCURRENCY,
+    OPENAI_MODEL_COMMITS,
+    OPENAI_MODEL_PR,
+    SMALL_DIFF_MAX_CHARS,
+)
+from ..ui import spinner
 from ..validation import lint_commit_dict, lint_git_commit_subject
-from .client import get_openai_client, parse_json_from_openai_response
-from .prompts import AMENDMENT_PROMPT, COMMIT_GENERATION_PROMPT, FIX_PROMPT_INSTRUCTIONS
+from . import cache
+from .batch import check_batch, read_batch_output, submit_batch, wait_for_batch
+from .client import (
+    get_openai_client,
+    iter_json_array_items,
+    parse_json_from_openai_response,
+    stream_response_text,
+)
+from .diffs import chunk_diff, compress_diff, estimate_tokens, split_diff_by_file, summarize_diff
+from .heuristics import plan_trivial_commit
+from .prompts import (
+    AMENDMENT_PROMPT,
+    COMMIT_GENERATION_PROMPT,
+    COMMIT_PLAN_FORMAT,
+    FIX_PROMPT_HEADER,
+    FIX_SUMMARY_PROMPT_HEADER,
+)
+
+# Compact separators keep JSON payloads (and token counts) small.
+_JSON_SEPARATORS = (",", ":")
+
+
+def _ask(
+    prompt,
+    validate,
+    model=OPENAI_MODEL_COMMITS,
+    message="Consulting our AI overlords...",
+    validate_item=None,
+    batch=False,
+    text_format=None,
+):
+    """
+    Send `prompt` to OpenAI and return `validate(raw_text)`.
+
+    The response is streamed. For array-shaped answers, `validate_item` is called
+    on each element as soon as it parses, so an invalid plan aborts the request
+    early instead of after the full generation.
+
+    Responses are cached on disk by (model, prompt); a response is only stored
+    once `validate` accepts it, so a bad answer is never replayed. Pass
+    `message=None` to skip the spinner (e.g. when the caller shows its own).
+
+    With `batch=True` the prompt goes through the Batch API instead: half the
+    price, but the answer may take minutes (up to 24h) to arrive.
+
+    `text_format` requests structured output (see `COMMIT_PLAN_FORMAT`).
+    """
+    key = cache.make_key(model, prompt)
+    cached = cache.get(key)
+    if cached is not None:
+        return validate(cached)
+
+    client = get_openai_client()
+    if batch:
+        with spinner(message or "Waiting for OpenAI batch..."):
+            batch_id = submit_batch(client, [(key, model, prompt)], text_format)
+            raw_text = read_batch_output(client, wait_for_batch(client, batch_id))[key]
+        result = validate(raw_text)
+        cache.put(key, raw_text)
+        return result
+
+    parts = []
+    received = 0
+
+    def _deltas():
+        nonlocal received
+        for delta in stream_response_text(client, model, prompt, text_format):
+            parts.append(delta)
+            received += len(delta)
+            progress(f"({received} chars received)")
+            yield delta
+
+    with spinner(message) if message else nullcontext(lambda detail: None) as progress:
+        if validate_item is None:
+            for _ in _deltas():
+                pass
+        else:
+            for item in iter_json_array_items(_deltas()):
+                validate_item(item)
+
+    raw_text = "".join(parts)
+    result = validate(raw_text)
+    cache.put(key, raw_text)
+    return result
+
+
+def _ask_commits_chunk(files, diff, message="Consulting our AI overlords..."):
+    prompt = COMMIT_GENERATION_PROMPT.substitute(files=files, diff=diff)
+    # Small change sets do not need the larger model.
+    model = OPENAI_MODEL_PR if len(diff) < SMALL_DIFF_MAX_CHARS else OPENAI_MODEL_COMMITS
+
+    def _validate(raw_text):
+        # The schema guarantees well-formed JSON, so no fence/prose scanning is needed.
+        commits = json.loads(raw_text)
+        if isinstance(commits, dict):
+            commits = commits.get("commits") or []
+        # Lint all commits and build subject lines
+        for c in commits:
+            _ = lint_commit_dict(c)
+        return commits
+
+    return _ask(
+        prompt,
+        _validate,
+        model=model,
+        message=message,
+        validate_item=lint_commit_dict,
+        text_format=COMMIT_PLAN_FORMAT,
+    )
+
+
+def _plan_commits(files, diff):
+    if estimate_tokens(diff) <= COMMIT_PROMPT_MAX_TOKENS:
+        return _ask_commits_chunk(files, diff)
+
+    chunks = chunk_diff(files, diff, COMMIT_PROMPT_MAX_TOKENS)
+    with spinner(f"Consulting our AI overlords ({len(chunks)} requests)..."):
+        with ThreadPoolExecutor(max_workers=OPENAI_MAX_CONCURRENCY) as pool:
+            results = list(pool.map(lambda chunk: _ask_commits_chunk(*chunk, message=None), chunks))
+
+    merged = []
+    claimed = set()
+    for commit in (c for chunk_commits in results for c in chunk_commits):
+        files_left = [f for f in commit.get("files", []) if f not in claimed]
+        claimed.update(files_left)
+        if files_left:
+            merged.append({**commit, "files": files_left})
+    return merged
+
+
+def _file_plan_key(section):
+    return cache.make_key("file-plan", section)
+
+
+def _reuse_file_plans(files, sections):
+    """
+    Split `files` into commits rebuilt from cached per-file plans and the files
+    that still need the model. Cached files sharing a plan become one commit.
+    """
+    keys = {path: _file_plan_key(section) for path, section in sections.items()}
+    known = cache.get_file_plans(keys.values())
+    grouped = {}
+    novel = []
+    for path in files:
+        plan = known.get(keys.get(path))
+        if plan is None:
+            novel.append(path)
+            continue
+        group_key = (plan["type"], plan["title"], plan.get("body") or "")
+        grouped.setdefault(group_key, {**plan, "files": []})["files"].append(path)
+    return list(grouped.values()), novel
+
+
+def _remember_file_plans(commits, sections):
+    cache.put_file_plans(
+        {
+            _file_plan_key(sections[path]): {
+                "type": c["type"],
+                "title": c["title"],
+                "body": c.get("body") or "",
+            }
+            for c in commits
+            for path in c.get("files", [])
+            if path in sections
+        }
+    )
 
 
 def ask_openai_for_commits(files, diff):
     """
     Ask OpenAI to generate commit messages based on files and diff.
 
+    Diffs larger than `COMMIT_PROMPT_MAX_TOKENS` (estimated) are split into
+    per-file chunks that are planned concurrently; the resulting commits are
+    concatenated in chunk order, and a file claimed by an earlier commit is
+    dropped from later ones.
+
+    Trivial single-file changes (see `plan_trivial_commit`) are planned
+    locally without calling the API. Files whose diff is byte-identical to one
+    planned before reuse that plan, and only the remaining files are sent.
+
     Args:
         files: List of file paths
         diff: Diff string
@@ -20,68 +203,119 @@ def ask_openai_for_commits(files, diff):
     Returns:
         List of commit dictionaries
     """
-    client = get_openai_client()
-    display_spinning_animation("Consulting our AI overlords...")
+    trivial = plan_trivial_commit(files, diff)
+    if trivial is not None:
+        return trivial
 
-    prompt = COMMIT_GENERATION_PROMPT.format(files=files, diff=diff)
+    sections = split_diff_by_file(diff)
+    reused, novel = _reuse_file_plans(files, sections)
+    if not novel:
+        return reused
+    if not all(path in sections for path in novel):
+        # A novel file without a section of its own (e.g. a header we could not
+        # parse) must not be planned blind: send everything as before.
+        reused = []
+    if reused:
+        files = novel
+        diff = "".join(sections[path] for path in novel)
+
+    commits = _plan_commits(files, compress_diff(diff))
+    _remember_file_plans(commits, sections)
+    return reused + commits
 
-    response = client.responses.create(
-        model=OPENAI_MODEL_COMMITS,
-        input=prompt
-    )
 
-    raw_text = response.output_text
-    commits = parse_json_from_openai_response(raw_text)
+def _ask_amendments_chunk(commits, batch=False, message="Consulting our AI overlords..."):
+    prompt = AMENDMENT_PROMPT.substitute(commits=json.dumps(commits, separators=_JSON_SEPARATORS))
 
-    # Lint all commits and build subject lines
-    for c in commits:
-        _ = lint_commit_dict(c)
+    def _validate(raw_text):
+        amendments = parse_json_from_openai_response(raw_text)
+        sha_set = {c["sha"] for c in commits}
+        for a in amendments:
+            sha = a.get("sha")
+            if sha not in sha_set:
+                raise ValueError(f"Amendment references unknown sha: {sha}")
+            _ = lint_git_commit_subject(a.get("subject", ""))
+        return amendments
 
-    return commits
+    return _ask(prompt, _validate, message=message, batch=batch)
 
 
-def ask_openai_for_amendments(commits):
+def ask_openai_for_amendments(commits, batch=False):
     """
     Ask OpenAI to propose amendments for existing commits.
 
+    Histories longer than `AMENDMENT_CHUNK_SIZE` commits are split into chunks
+    that are requested concurrently; the answers are concatenated in commit
+    order. A batch request always goes out as a single prompt.
+
     Args:
         commits: List of commit dictionaries with sha, subject, body
+        batch: Submit through the Batch API (cheaper, but slow to return)
 
     Returns:
         List of amendment dictionaries
     """
-    client = get_openai_client()
-    prompt = AMENDMENT_PROMPT.format(commits=json.dumps(commits, indent=2))
-
-    response = client.responses.create(model=OPENAI_MODEL_COMMITS, input=prompt)
-    raw_text = response.output_text
-    amendments = parse_json_from_openai_response(raw_text)
+    if batch or len(commits) <= AMENDMENT_CHUNK_SIZE:
+        return _ask_amendments_chunk(commits, batch=batch)
 
-    sha_set = {c["sha"] for c in commits}
-    for a in amendments:
-        sha = a.get("sha")
-        if sha not in sha_set:
-            raise ValueError(f"Amendment references unknown sha: {sha}")
-        _ = lint_git_commit_subject(a.get("subject", ""))
-    return amendments
+    chunks = [
+        commits[i : i + AMENDMENT_CHUNK_SIZE] for i in range(0, len(commits), AMENDMENT_CHUNK_SIZE)
+    ]
+    with spinner(f"Consulting our AI overlords ({len(chunks)} requests)..."):
+        with ThreadPoolExecutor(max_workers=OPENAI_MAX_CONCURRENCY) as pool:
+            results = list(
+                pool.map(lambda chunk: _ask_amendments_chunk(chunk, message=None), chunks)
+            )
+    return [a for chunk_amendments in results for a in chunk_amendments]
 
 
-def ask_openai_for_fix(commits):
+def ask_openai_for_fix(commits, batch=False):
     """
     Ask OpenAI for a rewritten commit plan.
 
     Args:
         commits: List of commit dictionaries with hash, message, diff
+        batch: Submit through the Batch API (cheaper, but slow to return)
 
     Returns:
         Rewrite plan dictionary
     """
-    client = get_openai_client()
-    prompt = (
-        f"{FIX_PROMPT_INSTRUCTIONS}\n\nCommits (oldest to newest):\n"
-        f"{json.dumps(commits, indent=2)}"
-    )
+    return _ask(_fix_prompt(commits), parse_json_from_openai_response, batch=batch)
+
+
+def _fix_prompt(commits):
+    commits = [{**c, "diff": compress_diff(c.get("diff", ""))} for c in commits]
+    header = FIX_PROMPT_HEADER
+    if sum(len(c["diff"]) for c in commits) > FIX_FULL_DIFF_MAX_CHARS:
+        # Too big to send whole: per-file change stats still show the shape
+        # of each commit at a fraction of the tokens.
+        commits = [{**c, "diff": summarize_diff(c["diff"])} for c in commits]
+        header = FIX_SUMMARY_PROMPT_HEADER
+    return header + json.dumps(commits, separators=_JSON_SEPARATORS)
+
+
+def start_fix_batch(commits):
+    """
+    Submit the fix prompt through the Batch API without waiting for it.
 
-    response = client.responses.create(model=OPENAI_MODEL_COMMITS, input=prompt)
-    raw_text = response.output_text
-    return parse_json_from_openai_response(raw_text)
+    Returns the batch id; pass it to `poll_fix_batch` later to collect the plan.
+    """
+    prompt = _fix_prompt(commits)
+    key = cache.make_key(OPENAI_MODEL_COMMITS, prompt)
+    return submit_batch(get_openai_client(), [(key, OPENAI_MODEL_COMMITS, prompt)])
+
+
+def poll_fix_batch(batch_id):
+    """
+    Return the rewrite plan from a `start_fix_batch` batch, or None if it is
+    still running. The answer is also cached, so a later synchronous `fix`
+    over the same commits reuses it.
+    """
+    client = get_openai_client()
+    batch = check_batch(client, batch_id)
+    if batch is None:
+        return None
+    [(key, raw_text)] = read_batch_output(client, batch).items()
+    plan = parse_json_from_openai_response(raw_text)
+    cache.put(key, raw_text)
+    return plan
@@ -0,0 +1,116 @@
+"""Diff preprocessing to keep prompts small."""
+
+import re
+
+from ..config import CHARS_PER_TOKEN, DIFF_MAX_FILE_CHARS, DIFF_MAX_HUNK_LINES, DIFF_SKIP_FILE_RE
+from ..git.diff import FILE_HEADER_RE, diff_header_path
+
+_FILE_SPLIT_RE = re.compile(r"^(?=diff --git )", re.MULTILINE)
+_HUNK_SPLIT_RE = re.compile(r"^(?=@@ )", re.MULTILINE)
+_BINARY_RE = re.compile(r"^(?:Binary files .* differ|GIT binary patch)$", re.MULTILINE)
+
+TRUNCATED_MARKER = "[... truncated ...]"
+
+
+def _truncate_hunk(hunk):
+    lines = hunk.splitlines(keepends=True)
+    if len(lines) <= DIFF_MAX_HUNK_LINES:
+        return hunk
+    return "".join(lines[:DIFF_MAX_HUNK_LINES]) + f"{TRUNCATED_MARKER}\n"
+
+
+def _compress_file(section):
+    header_match = FILE_HEADER_RE.match(section)
+    if header_match and DIFF_SKIP_FILE_RE.search(diff_header_path(header_match)):
+        # Lockfiles and minified bundles are noise to the model; keep just the
+        # header so it still knows the file changed.
+        return f"{header_match.group(0)}\n[generated file diff omitted]\n"
+    if header_match and _BINARY_RE.search(section):
+        return f"{header_match.group(0)}\n[binary file changed]\n"
+
+    section = "".join(_truncate_hunk(h) for h in _HUNK_SPLIT_RE.split(section))
+    if len(section) > DIFF_MAX_FILE_CHARS:
+        section = section[:DIFF_MAX_FILE_CHARS].rstrip("\n") + f"\n{TRUNCATED_MARKER}\n"
+    return section
+
+
+def compress_diff(diff):
+    """
+    Shrink a unified diff before it is sent to the model.
+
+    Generated files (lockfiles, minified bundles) and binary files are reduced
+    to their header, long hunks are cut to `DIFF_MAX_HUNK_LINES` lines and each file is capped at
+    `DIFF_MAX_FILE_CHARS` characters. Text that is not a git diff is returned
+    unchanged.
+    """
+    if not diff:
+        return diff
+    return "".join(_compress_file(section) for section in _FILE_SPLIT_RE.split(diff))
+
+
+def estimate_tokens(text):
+    """Cheaply estimate the token count of `text` (about 4 characters per token)."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def split_diff_by_file(diff):
+    """Return `{path: section}` for each file in a git diff, in diff order."""
+    sections = {}
+    for section in _FILE_SPLIT_RE.split(diff or ""):
+        header_match = FILE_HEADER_RE.match(section)
+        if header_match:
+            path = diff_header_path(header_match)
+            sections[path] = sections.get(path, "") + section
+    return sections
+
+
+def chunk_diff(files, diff, max_tokens):
+    """
+    Group `files` and their diff sections into chunks of at most ~`max_tokens`.
+
+    Returns a list of `(files, diff)` pairs. A single file larger than the
+    budget gets a chunk of its own; files without a diff section ride along
+    with the first chunk.
+    """
+    sections = split_diff_by_file(diff)
+    chunks = []
+    cur_files, cur_parts, cur_size = [], [], 0
+    for path, section in sections.items():
+        size = estimate_tokens(section)
+        if cur_parts and cur_size + size > max_tokens:
+            chunks.append((cur_files, "".join(cur_parts)))
+            cur_files, cur_parts, cur_size = [], [], 0
+        cur_files.append(path)
+        cur_parts.append(section)
+        cur_size += size
+    if cur_parts:
+        chunks.append((cur_files, "".join(cur_parts)))
+
+    leftover = [f for f in files if f not in sections]
+    if not chunks:
+        return [(list(files), diff)]
+    if leftover:
+        first_files, first_diff = chunks[0]
+        chunks[0] = (leftover + first_files, first_diff)
+    return chunks
+
+
+def summarize_diff(diff):
+    """
+    Reduce a git diff to one `path: +added -removed (N hunks)` line per file.
+
+    Keeps which files changed and how much, for prompts that cannot afford
+    the patch text itself.
+    """
+    lines = []
+    for path, section in split_diff_by_file(diff).items():
+        added = removed = hunks = 0
+        for line in section.splitlines():
+            if line.startswith("@@ "):
+                hunks += 1
+            elif line.startswith("+") and not line.startswith("+++ "):
+                added += 1
+            elif line.startswith("-") and not line.startswith("--- "):
+                removed += 1
+        lines.append(f"{path}: +{added} -{removed} ({hunks} hunks)")
+    return "\n".join(lines)
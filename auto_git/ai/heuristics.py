@@ -0,0 +1,62 @@
+"""Rule-based commit plans for changes too trivial to send to the model."""
+
+import os
+import re
+
+from ..config import DIFF_SKIP_FILE_RE
+from .diffs import split_diff_by_file
+
+_CHANGELOG_RE = re.compile(r"(^|/)(CHANGELOG|CHANGES|HISTORY)(\.[a-z]+)?$", re.IGNORECASE)
+_VERSION_LINE_RE = re.compile(r'^\s*"version"\s*:\s*"([^"]+)",?\s*$')
+
+
+def _changed_lines(section):
+    """Return the removed and added lines of a single-file diff section."""
+    removed, added = [], []
+    for line in section.splitlines():
+        if line.startswith(("---", "+++")):
+            continue
+        if line.startswith("-"):
+            removed.append(line[1:])
+        elif line.startswith("+"):
+            added.append(line[1:])
+    return removed, added
+
+
+def _plan(ctype, title, path):
+    return [{"type": ctype, "title": title, "body": "", "files": [path]}]
+
+
+def plan_trivial_commit(files, diff):
+    """
+    Return a one-commit plan for an obviously trivial change, or None.
+
+    Only single-file changes are considered: a lockfile update, a CHANGELOG
+    edit, a `package.json` version bump, or an edit to trailing whitespace or
+    line endings only. Anything else returns None and should be planned by the
+    model.
+    """
+    sections = split_diff_by_file(diff)
+    if len(files) != 1 or list(sections) != list(files):
+        return None
+    path = files[0]
+    name = os.path.basename(path)
+    removed, added = _changed_lines(sections[path])
+
+    if DIFF_SKIP_FILE_RE.search(path):
+        return _plan("chore", f"update {name}"[:74], path)
+    if _CHANGELOG_RE.search(path):
+        return _plan("docs", f"update {name}"[:74], path)
+    if name == "package.json" and len(removed) == len(added) == 1:
+        old, new = _VERSION_LINE_RE.match(removed[0]), _VERSION_LINE_RE.match(added[0])
+        if old and new:
+            return _plan("chore", f"bump version to {new.group(1)}"[:74], path)
+    if (
+        (removed or added)
+        and len(removed) == len(added)
+        # Only trailing whitespace and line endings: indentation and spacing
+        # inside a line can change meaning (Python blocks, string literals).
+        and all(r.rstrip() == a.rstrip() for r, a in zip(removed, added))
+    ):
+        return _plan("style", f"fix whitespace in {name}"[:74], path)
+    return None
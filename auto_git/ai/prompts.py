@@ -1,7 +1,10 @@
 """Prompt templates for AI interactions."""
 
+from string import Template
 from textwrap import dedent
 
+from ..config import COMMIT_TYPES
+
 FIX_PROMPT_INSTRUCTIONS = dedent("""
 # Instructions for Rewriting a Local Git Commit Tree into Clean JSON
 
@@ -113,17 +116,23 @@ Use this exact structure:
 ```
 """).strip()
 
-
-COMMIT_GENERATION_PROMPT = dedent("""
+# Everything before the per-call commit payload, assembled once at import.
+FIX_PROMPT_HEADER = f"{FIX_PROMPT_INSTRUCTIONS}\n\nCommits (oldest to newest):\n"
+# Used instead when the patches are too large to send in full.
+FIX_SUMMARY_PROMPT_HEADER = (
+    f"{FIX_PROMPT_INSTRUCTIONS}\n\n"
+    "The full diffs are too large to include. Each commit's `diff` field instead "
+    "lists one `path: +added -removed (N hunks)` line per changed file.\n\n"
+    "Commits (oldest to newest):\n"
+)
+
+
+# Static instructions come first and the per-call files/diff last, so every
+# request shares the longest possible prefix (OpenAI caches repeated prompt
+# prefixes, cutting input cost and time to first token).
+COMMIT_GENERATION_PROMPT = Template(dedent("""
     You are an AI that analyzes Git diffs and produces commit messages.
-
-    FILES INVOLVED:
-    {files}
-
-    DIFF:
-    ```
-    {diff}
-    ```
+    The files involved and their diff are given at the end.
 
     TASKS:
     1. Group changes into one or multiple commits logically.
@@ -148,33 +157,72 @@ COMMIT_GENERATION_PROMPT = dedent("""
         - build: build improvement
     4. Output ONLY valid JSON in this structure:
 
-    [
-      {{
-        "type": "feat|fix|docs|style|refactor|perf|test|chore|build|ci",
-        "title": "Short descriptive title, no type prefix, use lowercase",
-        "body": "Longer description of the change.",
-        "files": ["file1.js", "file2.ts"]
-      }}
-    ]
+    {
+      "commits": [
+        {
+          "type": "feat|fix|docs|style|refactor|perf|test|chore|build|ci",
+          "title": "Short descriptive title, no type prefix, use lowercase",
+          "body": "Longer description of the change.",
+          "files": ["file1.js", "file2.ts"]
+        }
+      ]
+    }
 
     Do NOT add any commentary outside the JSON.
-""")
+
+    FILES INVOLVED:
+    $files
+
+    DIFF:
+    ```
+    $diff
+    ```
+"""))
+
+# Structured-output schema for commit plans. Strict mode needs an object root,
+# so the list is wrapped in {"commits": [...]}.
+COMMIT_PLAN_FORMAT = {
+    "type": "json_schema",
+    "name": "commit_plan",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "additionalProperties": False,
+        "required": ["commits"],
+        "properties": {
+            "commits": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "additionalProperties": False,
+                    "required": ["type", "title", "body", "files"],
+                    "properties": {
+                        "type": {"type": "string", "enum": sorted(COMMIT_TYPES)},
+                        "title": {"type": "string"},
+                        "body": {"type": "string"},
+                        "files": {"type": "array", "items": {"type": "string"}},
+                    },
+                },
+            }
+        },
+    },
+}
 
 
-AMENDMENT_PROMPT = dedent("""
+AMENDMENT_PROMPT = Template(dedent("""
     You are helping rewrite commit messages for a linear Git history.
     For each commit, propose a new Conventional Commit subject and optional body.
     Keep the same commit order; do not merge or split commits.
 
     Return JSON array like:
     [
-      {{
+      {
         "sha": "<orig sha>",
         "subject": "feat: better subject",
         "body": "optional body"
-      }}
+      }
     ]
 
     Commits (oldest first):
-    {commits}
-""")
+    $commits
+"""))
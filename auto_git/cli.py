@@ -1,36 +1,42 @@
 """CLI commands and entry point."""
 
 import json
+import os
 import signal
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import click
-from watchdog.observers import Observer
 
-from .config import __version__
+from .ai import cache as response_cache
+from .ai.batch import BatchFailedError
+from .config import WATCH_DEBOUNCE_SECONDS, WATCH_POLL_INTERVAL_SECONDS, __version__
 from .git import (
     apply_commits,
     apply_fix_plan,
+    find_merges,
     get_changed_files,
     get_commits_for_fix,
-    get_commits_since_push,
     get_diff,
+    get_git_dir,
+    get_status,
     get_unpushed_commits,
-    get_untracked_files,
     get_upstream_ref,
+    iter_commits_since_push,
     rewrite_commits,
     run,
 )
 from .ui import display_spinning_animation, format_commit_preview
 from .validation import lint_git_commit_subject
-from .watcher import ChangeHandler
+from .watcher import ChangeHandler, make_observer
 
 
 @click.group()
 @click.version_option(version=__version__)
-def cli():
+@click.option("--no-cache", is_flag=True, help="Always ask OpenAI; skip the response cache.")
+def cli(no_cache):
     """Auto-git: AI-powered git commit automation."""
-    pass
+    response_cache.set_enabled(not no_cache)
 
 
 @cli.command()
@@ -44,12 +50,14 @@ def generate(staged, unstaged, untracked):
     if not (staged or unstaged):
         staged = unstaged = True
 
-    untracked_files = get_untracked_files() if untracked else []
+    changes = get_status()
+    untracked_files = changes["untracked"] if untracked else []
     files = get_changed_files(
         staged=staged,
         unstaged=unstaged,
         untracked=untracked,
         untracked_files=untracked_files,
+        status=changes,
     )
     if not files:
         click.echo("No changed files found")
@@ -78,12 +86,14 @@ def commit(staged, unstaged, untracked, dry_run):
     if not (staged or unstaged):
         staged = unstaged = True
 
-    untracked_files = get_untracked_files() if untracked else []
+    changes = get_status()
+    untracked_files = changes["untracked"] if untracked else []
     files = get_changed_files(
         staged=staged,
         unstaged=unstaged,
         untracked=untracked,
         untracked_files=untracked_files,
+        status=changes,
     )
     if not files:
         click.echo("No changed files found")
@@ -115,7 +125,12 @@ def commit(staged, unstaged, untracked, dry_run):
 @click.option("--max-count", default=20, help="If no upstream, how many last commits to consider")
 @click.option("--dry-run", is_flag=True, help="Preview amendments without rewriting")
 @click.option("--allow-dirty", is_flag=True, help="Allow running with a dirty working tree")
-def amend_unpushed(max_count, dry_run, allow_dirty):
+@click.option(
+    "--batch",
+    is_flag=True,
+    help="Request amendments through the OpenAI Batch API (half price, may take a while).",
+)
+def amend_unpushed(max_count, dry_run, allow_dirty, batch):
     """Amend unpushed commit messages using AI suggestions."""
     import auto_git as ag
 
@@ -128,7 +143,10 @@ def amend_unpushed(max_count, dry_run, allow_dirty):
     for c in commits:
         click.echo(f"  - {c['sha'][:7]} {c['subject']}")
 
-    amendments = ag.ask_openai_for_amendments(commits)
+    # The merge check is independent of the AI answer, so run it while we wait.
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        merges_future = pool.submit(find_merges, commits[0]["sha"], commits[-1]["sha"])
+        amendments = ag.ask_openai_for_amendments(commits, batch=batch)
 
     amend_map = {a["sha"]: a for a in amendments}
     amendments_sorted = []
@@ -151,16 +169,7 @@ def amend_unpushed(max_count, dry_run, allow_dirty):
         return
 
     # Refuse to rewrite merge history
-    upstream = get_upstream_ref()
-    if upstream:
-        rev_range = f"{upstream}..HEAD"
-    else:
-        first_parent = run(f"git show -s --format=%P {commits[0]['sha']}").split()
-        base = first_parent[0] if first_parent else ""
-        rev_range = f"{base}..{commits[-1]['sha']}"
-
-    merges = run(f"git rev-list --merges --first-parent {rev_range}")
-    if merges.strip():
+    if merges_future.result().strip():
         click.secho("History contains merges; linear rewrite only. Aborting.", fg="red")
         return
 
@@ -177,9 +186,16 @@ def amend_unpushed(max_count, dry_run, allow_dirty):
 @click.option("--max-count", default=20, help="If no upstream, how many last commits to consider")
 @click.option("--dry-run", is_flag=True, help="Preview amendments without rewriting")
 @click.option("--allow-dirty", is_flag=True, help="Allow running with a dirty working tree")
-def amend_unpushed_alias(max_count, dry_run, allow_dirty):
+@click.option(
+    "--batch",
+    is_flag=True,
+    help="Request amendments through the OpenAI Batch API (half price, may take a while).",
+)
+def amend_unpushed_alias(max_count, dry_run, allow_dirty, batch):
     """Alias for `amend_unpushed` (same behavior)."""
-    return amend_unpushed(max_count=max_count, dry_run=dry_run, allow_dirty=allow_dirty)
+    return amend_unpushed(
+        max_count=max_count, dry_run=dry_run, allow_dirty=allow_dirty, batch=batch
+    )
 
 
 @cli.command()
@@ -191,10 +207,23 @@ def amend_unpushed_alias(max_count, dry_run, allow_dirty):
     type=int,
     help="Maximum commits to include when no upstream or when forcing.",
 )
-def fix(force, max_count):
+@click.option(
+    "--batch",
+    is_flag=True,
+    help="Request the plan through the OpenAI Batch API (half price, may take a while).",
+)
+@click.option(
+    "--no-wait",
+    is_flag=True,
+    help="With --batch (required), submit and exit; apply the plan later with `fix-poll`.",
+)
+def fix(force, max_count, batch, no_wait):
     """Ask AI for a rewritten commit plan and apply it."""
     import auto_git as ag
 
+    if no_wait and not batch:
+        raise click.UsageError("--no-wait requires --batch.")
+
     _, commits = get_commits_for_fix(max_count=max_count, force=force)
     if not commits:
         click.echo("No commits to process.")
@@ -213,12 +242,38 @@ def fix(force, max_count):
             err=True,
         )
 
+    if no_wait:
+        try:
+            batch_id = ag.start_fix_batch(commits)
+        except Exception as exc:  # noqa: BLE001
+            click.secho(f"Failed to submit rewrite batch: {exc}", fg="red")
+            return
+        pending = {
+            "batch_id": batch_id,
+            "hashes": [c["hash"] for c in commits],
+            "max_count": max_count,
+            "force": force,
+        }
+        with open(_pending_fix_path(), "w", encoding="utf-8") as fh:
+            json.dump(pending, fh)
+        click.echo(f"Submitted OpenAI batch {batch_id}; run `auto-git fix-poll` to apply it.")
+        return
+
     try:
-        rewrite_plan = ag.ask_openai_for_fix(commits)
+        rewrite_plan = ag.ask_openai_for_fix(commits, batch=batch)
     except Exception as exc:  # noqa: BLE001
         click.secho(f"Failed to get rewrite plan: {exc}", fg="red")
         return
 
+    _apply_rewrite_plan(commits, rewrite_plan)
+
+
+def _pending_fix_path():
+    # Per repository, so a pending batch is only ever applied where it was made.
+    return os.path.join(get_git_dir(), "auto-git-fix-batch.json")
+
+
+def _apply_rewrite_plan(commits, rewrite_plan):
     click.echo(json.dumps(rewrite_plan, indent=2))
 
     try:
@@ -233,42 +288,93 @@ def fix(force, max_count):
     )
 
 
+@cli.command(name="fix-poll")
+def fix_poll():
+    """Apply the plan from a `fix --batch --no-wait` request once it is ready."""
+    import auto_git as ag
+
+    path = _pending_fix_path()
+    try:
+        with open(path, encoding="utf-8") as fh:
+            pending = json.load(fh)
+    except (OSError, ValueError):
+        click.echo("No pending fix batch.")
+        return
+
+    try:
+        rewrite_plan = ag.poll_fix_batch(pending["batch_id"])
+    except BatchFailedError as exc:
+        click.secho(f"Failed to get rewrite plan: {exc}", fg="red")
+        os.remove(path)
+        return
+    except Exception as exc:  # noqa: BLE001
+        # Network errors, API 5xx or a missing key: the batch may still be fine.
+        click.secho(f"Could not check batch {pending['batch_id']}: {exc}", fg="red")
+        click.echo("The pending batch is kept; run `fix-poll` again to retry.")
+        return
+    if rewrite_plan is None:
+        click.echo(f"Batch {pending['batch_id']} is still running; try again later.")
+        return
+    os.remove(path)
+
+    _, commits = get_commits_for_fix(max_count=pending["max_count"], force=pending["force"])
+    if [c["hash"] for c in commits] != pending["hashes"]:
+        click.secho("History changed since the batch was submitted; not applying.", fg="red")
+        return
+
+    _apply_rewrite_plan(commits, rewrite_plan)
+
+
+@cli.group(name="cache")
+def cache_group():
+    """Manage the on-disk cache of OpenAI responses."""
+
+
+@cache_group.command(name="clear")
+def cache_clear():
+    """Delete all cached OpenAI responses."""
+    removed = response_cache.clear()
+    click.echo(f"Removed {removed} cached response(s) from {response_cache.get_cache_dir()}")
+
+
 @cli.command()
 def status():
     """Show staged and unstaged changes."""
+    changes = get_status()
     click.echo("Staged:")
-    click.echo(run("git diff --cached --name-only") or "(none)")
+    click.echo("\n".join(changes["staged"]) or "(none)")
     click.echo("\nUnstaged:")
-    click.echo(run("git diff --name-only") or "(none)")
+    click.echo("\n".join(changes["unstaged"]) or "(none)")
 
 
 @cli.command()
 @click.argument("count", required=False, default=10)
 def lint(count):
     """Lint recent commit messages against Conventional Commits format."""
-    source_desc, lines = get_commits_since_push(fallback_count=count)
+    source_desc, subjects = iter_commits_since_push(fallback_count=count)
 
     click.echo(f"Commits inspected: {source_desc}")
-    if lines:
-        for subj in lines:
-            click.echo(f"  - {subj}")
-    else:
-        click.echo("  (none)")
-        return
-
+    # Lint while git is still producing the log, so output starts immediately.
+    checked = 0
     errors = []
-    for subj in lines:
+    for subj in subjects:
+        checked += 1
+        click.echo(f"  - {subj}")
         try:
             lint_git_commit_subject(subj)
         except ValueError as e:
             errors.append(f"{subj}: {e}")
 
+    if not checked:
+        click.echo("  (none)")
+        return
+
     if errors:
         click.echo("\nErrors:")
         for err in errors:
             click.echo(f"  - {err}")
     else:
-        click.echo(f"Last {len(lines)} commits pass lint")
+        click.echo(f"Last {checked} commits pass lint")
 
 
 @cli.command()
@@ -279,7 +385,20 @@ def lint(count):
     type=int,
     help="Polling interval in seconds (default is 5 minutes)",
 )
-def watch(interval):
+@click.option(
+    "--poll/--no-poll",
+    default=None,
+    help="Scan for changes instead of using OS notifications (default: auto, polls on "
+    "network mounts).",
+)
+@click.option(
+    "--poll-interval",
+    default=WATCH_POLL_INTERVAL_SECONDS,
+    show_default=True,
+    type=float,
+    help="Seconds between scans when polling.",
+)
+def watch(interval, poll, poll_interval):
     """Watch for file changes and auto-commit."""
     display_spinning_animation()
     stop_event = threading.Event()
@@ -288,9 +407,12 @@ def watch(interval):
         ignore_dirs=[".git"],
         stop_event=stop_event,
         interval_seconds=interval_seconds,
+        debounce_seconds=WATCH_DEBOUNCE_SECONDS,
     )
-    observer = Observer()
-    observer.schedule(event_handler, path=".", recursive=True)
+    observer = make_observer(poll=poll, poll_interval=poll_interval)
+    # An absolute watch path makes event paths absolute, so the handler can
+    # match them against its ignore prefixes without normalizing each one.
+    observer.schedule(event_handler, path=os.path.abspath("."), recursive=True)
     observer.start()
 
     def _handle_signal(signum, frame):
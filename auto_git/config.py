@@ -8,9 +8,61 @@ COMMIT_TYPES = {
     "feat", "fix", "docs", "style", "refactor", "perf", "test", "build", "ci", "chore", "revert"
 }
 
-COMMIT_SUBJECT_RE = re.compile(
-    r"^(feat|fix|docs|style|refactor|perf|test|build|ci|chore|revert)(\(.+\))?: .+$"
-)
-
 OPENAI_MODEL_COMMITS = "gpt-4.1"
 OPENAI_MODEL_PR = "gpt-4.1-mini"
+# Deterministic sampling keeps plans stable for identical diffs (and cacheable).
+OPENAI_TEMPERATURE = 0
+
+# Diffs smaller than this (in characters) are planned with the cheaper model.
+SMALL_DIFF_MAX_CHARS = 4000
+
+# Files whose diffs are omitted from prompts (lockfiles, minified bundles).
+DIFF_SKIP_FILE_RE = re.compile(r"(^|/)(package-lock\.json|[^/]*\.lock|[^/]*\.min\.js)$")
+# Per-hunk line and per-file character caps applied before prompting.
+DIFF_MAX_HUNK_LINES = 200
+DIFF_MAX_FILE_CHARS = 20000
+# Options for every diff fed to the model: no external drivers or colour, the
+# histogram algorithm (tighter hunks around moved code) and no context lines,
+# which cost tokens without telling the model what changed. The a/ and b/
+# prefixes are forced so diff.noprefix or diff.mnemonicPrefix cannot break the
+# per-file header parsing.
+PROMPT_DIFF_OPTIONS = (
+    "--no-ext-diff",
+    "--no-color",
+    "--diff-algorithm=histogram",
+    "--unified=0",
+    "--src-prefix=a/",
+    "--dst-prefix=b/",
+)
+
+# Diffs larger than this many (estimated) tokens are planned in per-file
+# chunks, requested in parallel.
+COMMIT_PROMPT_MAX_TOKENS = 60000
+# Above this many characters of (compressed) diff, `fix` sends per-file change
+# stats instead of patches.
+FIX_FULL_DIFF_MAX_CHARS = 200_000
+# Rough characters-per-token ratio used to estimate prompt size without a tokenizer.
+CHARS_PER_TOKEN = 4
+OPENAI_MAX_CONCURRENCY = 4
+# Commits per amendment request; longer histories are split and sent in parallel.
+AMENDMENT_CHUNK_SIZE = 20
+
+# Seconds between status checks while waiting on an OpenAI batch (`fix --batch`).
+BATCH_POLL_SECONDS = 30
+
+# Number of OpenAI responses kept in the on-disk cache.
+RESPONSE_CACHE_MAX_ENTRIES = 10
+# Cached responses older than this are ignored and re-requested.
+RESPONSE_CACHE_TTL_SECONDS = 24 * 60 * 60
+# Per-file commit classifications remembered between runs (keyed by file diff).
+FILE_PLAN_CACHE_MAX_ENTRIES = 500
+
+# Quiet period (seconds) the watcher waits for after the last file event.
+WATCH_DEBOUNCE_SECONDS = 0.5
+# After a slow watcher run, wait this many times its duration before the next one.
+WATCH_BACKOFF_FACTOR = 1.5
+
+# Seconds between tree re-scans when the watcher falls back to polling.
+WATCH_POLL_INTERVAL_SECONDS = 60
+# Filesystem types on which native change notifications are unreliable.
+NETWORK_FS_TYPES = frozenset({"nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "fuse.sshfs"})
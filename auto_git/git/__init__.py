@@ -1,41 +1,67 @@
 """Git utilities package."""
 
 from .core import (
+    clear_git_cache,
     get_current_branch,
+    get_git_dir,
     get_origin_repo_slug,
     get_upstream_ref,
     is_git_ignored,
     is_tracked,
+    is_worktree_clean,
+    read_commit,
+    resolve_rev,
     run,
+    run_parallel,
+    stream_records,
 )
 from .diff import (
+    clear_diff_cache,
     get_changed_files,
     get_diff,
+    get_diff_by_file,
+    get_status,
     get_untracked_files,
 )
 from .history import (
     apply_commits,
     apply_fix_plan,
+    find_merges,
     get_commits_for_fix,
     get_commits_since_push,
     get_unpushed_commits,
+    iter_commits_since_push,
+    print_commit_log,
     rewrite_commits,
 )
 
 __all__ = [
     "run",
+    "run_parallel",
+    "stream_records",
+    "clear_git_cache",
     "get_upstream_ref",
     "get_current_branch",
+    "get_git_dir",
     "get_origin_repo_slug",
     "is_tracked",
+    "is_worktree_clean",
+    "read_commit",
+    "resolve_rev",
     "is_git_ignored",
     "get_untracked_files",
     "get_changed_files",
     "get_diff",
+    "get_diff_by_file",
+    "clear_diff_cache",
+    "get_status",
     "get_commits_since_push",
+    "iter_commits_since_push",
     "get_unpushed_commits",
     "get_commits_for_fix",
     "apply_fix_plan",
+    "find_merges",
     "apply_commits",
+    "print_commit_log",
     "rewrite_commits",
 ]
@@ -3,46 +3,191 @@
 import os
 import shlex
 import subprocess
+import tempfile
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from pathlib import PurePath
 
+from .ipc import CatFileBatch, CatFileBatchCheck, CheckIgnoreBatch, GitWorkerError
 
-def run(cmd):
+# Persistent git helper processes, one per (helper class, working directory).
+_workers = {}
+
+
+def _get_worker(worker_cls, cwd=None):
+    key = (worker_cls, cwd or os.getcwd())
+    worker = _workers.get(key)
+    if worker is None:
+        worker = _workers.setdefault(key, worker_cls(key[1]))
+    return worker
+
+
+def read_commit(rev):
+    """
+    Return `{"tree": sha, "parents": [sha, ...]}` for commit `rev`.
+
+    Served by a long-lived `git cat-file --batch` process, so walking many
+    commits costs one pipe round trip each instead of a `git show` spawn.
+    """
+    return _get_worker(CatFileBatch).read_commit(rev)
+
+
+def resolve_rev(rev):
+    """Return the object id for `rev` (e.g. "HEAD"), or None if it does not exist."""
+    return _get_worker(CatFileBatch).resolve(rev)
+
+
+# Decoding for commands whose input or output carries file paths: undecodable
+# bytes become lone surrogates and are written back to git unchanged, so paths
+# that are not valid UTF-8 survive a round trip.
+PATH_ERRORS = "surrogateescape"
+
+
+def run(cmd, input=None, errors="ignore", env=None):
     """
     Run a command and return stripped output.
 
-    Accepts either a string (split using shlex) or an argv list. We avoid invoking
-    a shell so file paths containing characters like '(' and ')' are handled
-    safely.
+    Takes an argv list. We avoid invoking a shell so file paths containing
+    characters like '(' and ')' are handled safely. A command string is still
+    split with shlex but is deprecated. `input` (str or bytes) is written to the
+    command's stdin.
+
+    `errors` is the UTF-8 error handler for both directions; pass `PATH_ERRORS`
+    when paths are read from or sent to git. `env` replaces the environment of
+    the command, e.g. to point GIT_INDEX_FILE at a scratch index.
     """
-    args = cmd if isinstance(cmd, (list, tuple)) else shlex.split(cmd)
-    return (
-        subprocess.check_output(args, stderr=subprocess.STDOUT)
-        .decode("utf-8", errors="ignore")
-        .strip()
-    )
+    args = cmd
+    if isinstance(cmd, str):
+        warnings.warn(
+            "run() with a command string is deprecated; pass an argv list",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        args = shlex.split(cmd)
+    if isinstance(input, str):
+        input = input.encode("utf-8", errors=errors)
+    # Capture bytes and decode explicitly: text mode would translate "\r\n"
+    # and lone "\r" to "\n", mangling CRLF diffs, commit text and `-z` paths.
+    try:
+        out = subprocess.check_output(args, stderr=subprocess.STDOUT, input=input, env=env)
+    except subprocess.CalledProcessError as exc:
+        exc.output = exc.output.decode("utf-8", errors=errors)
+        raise
+    return out.decode("utf-8", errors=errors).strip()
 
 
-def get_upstream_ref():
+def run_parallel(cmds, max_workers=4, env=None):
     """
-    Return the upstream ref if present; suppress git stderr noise when absent.
+    Run independent read-only commands concurrently and return their outputs in order.
+
+    Each command is dispatched through `run`; git spends most of its time in
+    process startup and I/O, so threads overlap the waits without contention.
+    `env` is passed to every command.
     """
+    cmds = list(cmds)
+    if len(cmds) <= 1:
+        return [run(cmd, env=env) for cmd in cmds]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(cmds))) as pool:
+        return list(pool.map(partial(run, env=env), cmds))
+
+
+def stream_records(argv, sep=b"\x1e", chunk_size=65536):
+    """
+    Yield `sep`-delimited records from a command's stdout as they arrive.
+
+    Unlike `run`, the full output is never held in memory at once, which keeps
+    peak usage flat for large `git log -p` ranges. Records are decoded like
+    `run` output but not stripped; empty records are skipped. Raises
+    CalledProcessError (with stderr as output) if the command fails.
+    """
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(list(argv), stdout=subprocess.PIPE, stderr=err)
+        try:
+            # Pieces of the record in progress. Only each new chunk is searched
+            # for `sep` (plus a few carried bytes in case a multi-byte `sep`
+            # straddles two reads), so one huge record stays linear.
+            pending = []
+            while True:
+                chunk = proc.stdout.read(chunk_size)
+                if not chunk:
+                    break
+                carry = pending[-1][1 - len(sep) :] if pending and len(sep) > 1 else b""
+                if sep not in carry + chunk:
+                    pending.append(chunk)
+                    continue
+                *records, rest = b"".join([*pending, chunk]).split(sep)
+                pending = [rest] if rest else []
+                for record in records:
+                    if record:
+                        yield record.decode("utf-8", errors="ignore")
+            if pending:
+                yield b"".join(pending).decode("utf-8", errors="ignore")
+        finally:
+            # Reap the process even if the consumer stops iterating early.
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode:
+            err.seek(0)
+            raise subprocess.CalledProcessError(returncode, argv, output=err.read())
+
+
+@lru_cache(maxsize=8)
+def _upstream_ref_for(cwd):
     try:
         out = subprocess.check_output(
             ["git", "rev-parse", "--abbrev-ref", "--symbolic-full-name", "@{u}"],
             stderr=subprocess.DEVNULL,
+            cwd=cwd,
+            encoding="utf-8",
+            errors="ignore",
         )
-        return out.decode("utf-8", errors="ignore").strip()
+        return out.strip()
     except subprocess.CalledProcessError:
         return None
 
 
+@lru_cache(maxsize=8)
+def _git_dir_for(cwd):
+    return os.path.join(cwd, run(["git", "-C", cwd, "rev-parse", "--git-dir"]))
+
+
+@lru_cache(maxsize=8)
+def _current_branch_for(cwd):
+    return run(["git", "-C", cwd, "rev-parse", "--abbrev-ref", "HEAD"])
+
+
+def get_upstream_ref():
+    """
+    Return the upstream ref if present; suppress git stderr noise when absent.
+
+    The result is cached per working directory for the life of the process; call
+    `clear_git_cache()` if the upstream may have changed.
+    """
+    return _upstream_ref_for(os.getcwd())
+
+
+def get_git_dir():
+    """Return the absolute path of the repository's git directory (cached)."""
+    return _git_dir_for(os.getcwd())
+
+
 def get_current_branch():
-    """Get the current git branch name."""
-    return run("git rev-parse --abbrev-ref HEAD")
+    """Get the current git branch name (cached like `get_upstream_ref`)."""
+    return _current_branch_for(os.getcwd())
+
+
+def clear_git_cache():
+    """Drop cached ref lookups, e.g. between long-running watcher cycles."""
+    _upstream_ref_for.cache_clear()
+    _current_branch_for.cache_clear()
 
 
 def get_origin_repo_slug():
     """Extract the owner/repo slug from the origin remote URL."""
-    url = run("git config --get remote.origin.url")
+    url = run(["git", "config", "--get", "remote.origin.url"])
     if url.startswith("git@"):
         _, path = url.split(":", 1)
     elif url.startswith("https://") or url.startswith("http://"):
@@ -61,7 +206,15 @@ def get_origin_repo_slug():
 
 
 def is_tracked(path):
-    """Check if a file is tracked by git."""
+    """Check if a file is tracked by git (has an entry in the index)."""
+    try:
+        # `:./<path>` names the stage-0 index entry for a cwd-relative path;
+        # one pipe round trip instead of an `ls-files` process per path.
+        if _get_worker(CatFileBatchCheck).exists(f":./{os.path.normpath(path)}"):
+            return True
+    except GitWorkerError:
+        pass
+    # Paths in a merge conflict only have stage 1-3 entries; let ls-files decide.
     result = subprocess.run(
         ["git", "ls-files", "--error-unmatch", path],
         stdout=subprocess.DEVNULL,
@@ -70,14 +223,67 @@ def is_tracked(path):
     return result.returncode == 0
 
 
-def is_git_ignored(path):
-    """Check if a path is ignored by git (including .git directory)."""
-    rel_path = os.path.relpath(path, ".")
-    if rel_path.startswith(".git"):
-        return True
+def is_worktree_clean():
+    """
+    Return True if the index and tracked files match HEAD and nothing is untracked.
+
+    Mirrors git's own `require_clean_work_tree`: refresh stat info, then let
+    `diff-index --quiet` answer through its exit code without producing any
+    output. Untracked (but not ignored) files count as dirty too: `reset --hard`
+    silently overwrites one that exists in the commit it moves to.
+    """
+    subprocess.run(
+        ["git", "update-index", "-q", "--refresh"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
     result = subprocess.run(
-        ["git", "check-ignore", "-q", rel_path],
+        ["git", "diff-index", "--quiet", "HEAD", "--"],
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
     )
-    return result.returncode == 0
+    if result.returncode != 0:
+        return False
+    # `--directory` lists an untracked directory once instead of walking it.
+    untracked = subprocess.run(
+        [
+            "git",
+            "ls-files",
+            "-z",
+            "--others",
+            "--exclude-standard",
+            "--directory",
+            "--no-empty-directory",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    return not untracked.stdout
+
+
+def is_git_ignored(path, root=None):
+    """
+    Check if a path is ignored by git (including .git directory).
+
+    `path` is resolved against `root`, which defaults to the current directory.
+    Long-running callers such as the watcher pass the root they captured at
+    startup, so a query costs no getcwd call.
+    """
+    root = root or os.getcwd()
+    # Joining first keeps relpath from resolving a relative `path` via getcwd.
+    rel_path = os.path.relpath(os.path.join(root, path), root)
+    # Compare the first component only: `.gitignore` and `.github/` are
+    # ordinary paths, only `.git/...` is git's own directory.
+    if PurePath(rel_path).parts[:1] == (".git",):
+        return True
+    try:
+        return _get_worker(CheckIgnoreBatch, root).is_ignored(rel_path)
+    except GitWorkerError:
+        # e.g. a path outside the repository; fall back to a one-off query.
+        result = subprocess.run(
+            ["git", "check-ignore", "-q", rel_path],
+            cwd=root,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return result.returncode == 0
@@ -1,17 +1,108 @@
 """Diff and file change detection utilities."""
 
-from .core import run
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+from ..config import PROMPT_DIFF_OPTIONS
+from .core import PATH_ERRORS, get_git_dir, resolve_rev, run, run_parallel
+
+# Recent get_diff results keyed by HEAD, index and file stat signatures.
+_DIFF_CACHE_SIZE = 32
+_diff_cache = {}
+# Start of each file's section in a git diff, capturing its (post-image) path.
+# Git C-quotes paths with unusual characters (see core.quotePath), so the path
+# lands in group 1 when quoted and in group 2 otherwise.
+FILE_HEADER_RE = re.compile(
+    r'^diff --git (?:".*"|a/.*) (?:"b/((?:[^"\\]|\\.)*)"|b/(.*))$', re.MULTILINE
+)
+_C_ESCAPE_RE = re.compile(rb"\\([0-7]{3}|.)")
+_C_ESCAPES = {
+    b"a": b"\a",
+    b"b": b"\b",
+    b"t": b"\t",
+    b"n": b"\n",
+    b"v": b"\v",
+    b"f": b"\f",
+    b"r": b"\r",
+}
+
+
+def _unquote_path(quoted):
+    """Undo git's C-style path quoting (octal escapes are UTF-8 bytes)."""
+
+    def _unescape(match):
+        esc = match.group(1)
+        return bytes([int(esc, 8)]) if len(esc) == 3 else _C_ESCAPES.get(esc, esc)
+
+    return _C_ESCAPE_RE.sub(_unescape, quoted.encode("utf-8")).decode("utf-8", errors="replace")
+
+
+def diff_header_path(match):
+    """Return the post-image path of a `FILE_HEADER_RE` match, unquoted."""
+    quoted, plain = match.groups()
+    return plain if quoted is None else _unquote_path(quoted)
+
+
+def _parse_porcelain_v2(out):
+    """
+    Classify `git status --porcelain=v2 -z` output into staged/unstaged/untracked.
+
+    Paths keep git's order; an unmerged path counts as both staged and unstaged.
+    """
+    status = {"staged": [], "unstaged": [], "untracked": []}
+    entries = out.split("\0")
+    i = 0
+    while i < len(entries):
+        entry = entries[i]
+        i += 1
+        kind = entry[:2]
+        if kind == "? ":
+            status["untracked"].append(entry[2:])
+            continue
+        if kind == "1 ":
+            fields = entry.split(" ", 8)
+        elif kind == "2 ":
+            fields = entry.split(" ", 9)
+            i += 1  # the rename/copy source follows as its own entry
+        elif kind == "u ":
+            fields = entry.split(" ", 10)
+        else:
+            # Ignored ("!") entries and headers are not changes.
+            continue
+        xy, path = fields[1], fields[-1]
+        if xy[0] != ".":
+            status["staged"].append(path)
+        if xy[1] != ".":
+            status["unstaged"].append(path)
+    return status
+
+
+def get_status():
+    """
+    Return staged, unstaged and untracked paths from a single `git status` call.
+
+    Returns:
+        Dict with "staged", "unstaged" and "untracked" path lists
+    """
+    out = run(
+        ["git", "status", "--porcelain=v2", "-z", "--untracked-files=all"], errors=PATH_ERRORS
+    )
+    return _parse_porcelain_v2(out)
 
 
 def get_untracked_files():
     """Get list of untracked files (excluding ignored files)."""
-    out = run("git ls-files --others --exclude-standard")
-    if not out:
-        return []
-    return [f for f in out.splitlines() if f.strip()]
+    return get_status()["untracked"]
 
 
-def get_changed_files(staged=False, unstaged=False, untracked=False, untracked_files=None):
+def get_changed_files(
+    staged=False, unstaged=False, untracked=False, untracked_files=None, status=None
+):
     """
     Get list of changed files based on specified criteria.
 
@@ -20,32 +111,114 @@ def get_changed_files(staged=False, unstaged=False, untracked=False, untracked_f
         unstaged: Include unstaged changes
         untracked: Include untracked files
         untracked_files: Pre-computed list of untracked files (optional)
+        status: Pre-computed `get_status()` result (optional)
 
     Returns:
         List of file paths
     """
-    files = []
+    if status is None:
+        status = get_status()
+    if untracked_files is None:
+        untracked_files = status["untracked"]
 
+    # A dict keeps first-seen order while making membership checks O(1).
+    files = {}
     if staged:
-        out = run("git diff --cached --name-only")
-        if out:
-            files.extend(out.splitlines())
-
+        files.update(dict.fromkeys(status["staged"]))
     if unstaged:
-        out = run("git diff --name-only")
-        if out:
-            for f in out.splitlines():
-                if f and f not in files:
-                    files.append(f)
-
+        files.update(dict.fromkeys(status["unstaged"]))
     if untracked:
-        if untracked_files is None:
-            untracked_files = get_untracked_files()
-        for f in untracked_files:
-            if f and f not in files:
-                files.append(f)
+        files.update(dict.fromkeys(f for f in untracked_files if f))
+
+    return list(files)
+
+
+def _diff_untracked(path):
+    # `--no-index` exits 1 when the files differ, which is always the case here.
+    result = subprocess.run(
+        ["git", "diff", *PROMPT_DIFF_OPTIONS, "--no-index", "--", os.devnull, path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    # Decoded by hand like `run` output, so CRLF line endings survive.
+    out = result.stdout.decode("utf-8", errors="ignore")
+    if result.returncode not in (0, 1):
+        raise subprocess.CalledProcessError(result.returncode, result.args, out)
+    return out.strip()
 
-    return files
+
+@contextmanager
+def _scratch_index():
+    """
+    Yield an environment whose GIT_INDEX_FILE is a throwaway copy of the index.
+
+    Whatever git writes there is discarded afterwards, so the user's own index
+    is left alone even if we are interrupted halfway.
+    """
+    with tempfile.TemporaryDirectory(prefix="auto-git-") as tmp:
+        scratch = os.path.join(tmp, "index")
+        real = os.path.join(get_git_dir(), "index")
+        if os.path.exists(real):
+            shutil.copyfile(real, scratch)
+        yield {**os.environ, "GIT_INDEX_FILE": scratch}
+
+
+def _add_intent(paths, env):
+    """Record `paths` as intent-to-add; return them, or [] if git refused."""
+    try:
+        run(
+            [
+                "git",
+                "--literal-pathspecs",
+                "add",
+                "-N",
+                "--pathspec-from-file=-",
+                "--pathspec-file-nul",
+            ],
+            input="\0".join(paths),
+            errors=PATH_ERRORS,
+            env=env,
+        )
+    except subprocess.CalledProcessError:
+        return []
+    return list(paths)
+
+
+def _head_or_empty_tree():
+    # Before the first commit there is no HEAD; diff against the empty tree so
+    # every staged file shows up as added.
+    return resolve_rev("HEAD") or run(["git", "hash-object", "-t", "tree", "--stdin"], input="")
+
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (path, None, None)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def _diff_cache_key(files, staged, unstaged, untracked_files):
+    """
+    Build a key that changes whenever the requested diff could change.
+
+    Covers HEAD, the index file and the stat data of every requested path, so a
+    storm of watcher events over unchanged content reuses the previous diff.
+    """
+    return (
+        os.getcwd(),
+        resolve_rev("HEAD"),
+        _stat_signature(os.path.join(get_git_dir(), "index")),
+        staged,
+        unstaged,
+        tuple(_stat_signature(f) for f in files),
+        tuple(_stat_signature(f) for f in untracked_files or ()),
+    )
+
+
+def clear_diff_cache():
+    """Forget memoized diffs (they are also invalidated automatically)."""
+    _diff_cache.clear()
 
 
 def get_diff(files, staged=False, unstaged=False, untracked_files=None):
@@ -61,14 +234,56 @@ def get_diff(files, staged=False, unstaged=False, untracked_files=None):
     Returns:
         Combined diff string
     """
-    diff_parts = []
+    key = _diff_cache_key(files, staged, unstaged, untracked_files)
+    cached = _diff_cache.get(key)
+    if cached is not None:
+        return cached
+
+    cmds = []
+    # With both staged and unstaged changes requested, one `git diff HEAD`
+    # covers index and worktree together (and shows each file's net change).
+    combined = staged and unstaged
+    if staged and files and not combined:
+        cmds.append(["git", "diff", *PROMPT_DIFF_OPTIONS, "--cached", "--", *files])
 
-    if staged and files:
-        diff_parts.append("git diff --cached -- " + " ".join(files))
-    if unstaged and files:
-        diff_parts.append("git diff -- " + " ".join(files))
-    if untracked_files:
-        for f in untracked_files:
-            diff_parts.append(f"git diff --no-index -- /dev/null {f}")
+    # Mark untracked files intent-to-add so the regular worktree diff shows them
+    # as new files: one git process instead of a `--no-index` diff per file.
+    # This happens in a scratch copy of the index, never in the user's own.
+    with _scratch_index() if untracked_files else nullcontext() as env:
+        intent_added = _add_intent(untracked_files, env) if untracked_files else []
+        diff_paths = list(dict.fromkeys([*(files if unstaged else ()), *intent_added]))
+        if diff_paths:
+            base = [_head_or_empty_tree()] if combined else []
+            cmds.append(["git", "diff", *PROMPT_DIFF_OPTIONS, *base, "--", *diff_paths])
+        # The staged and worktree diffs are independent, so run them side by side.
+        # `--cached` skips intent-to-add entries, so both can share the scratch index.
+        diff_parts = run_parallel(cmds, env=env)
 
-    return "\n".join(part for part in diff_parts if part)
+    if untracked_files and not intent_added:
+        # Fallback: `--no-index` compares exactly two paths, so one call per file.
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            diff_parts.extend(pool.map(_diff_untracked, untracked_files))
+
+    diff = "\n".join(part for part in diff_parts if part)
+    if len(_diff_cache) >= _DIFF_CACHE_SIZE:
+        _diff_cache.pop(next(iter(_diff_cache)))
+    _diff_cache[key] = diff
+    return diff
+
+
+def get_diff_by_file(files, staged=False, unstaged=False, untracked_files=None):
+    """
+    Get the same diff as `get_diff`, split into `{path: section}` in diff order.
+
+    Each section runs from its `diff --git` header to the next one. Sections
+    are cut from the (cached) `get_diff` result, so asking for both forms
+    costs one set of git calls.
+    """
+    diff = get_diff(files, staged=staged, unstaged=unstaged, untracked_files=untracked_files)
+    headers = list(FILE_HEADER_RE.finditer(diff))
+    sections = {}
+    ends = [m.start() for m in headers[1:]] + [len(diff)]
+    for match, end in zip(headers, ends, strict=True):
+        path = diff_header_path(match)
+        sections[path] = sections.get(path, "") + diff[match.start() : end]
+    return sections
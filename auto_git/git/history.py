@@ -1,33 +1,78 @@
 """Commit history operations including rewriting and applying commits."""
 
 import os
-import shlex
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 
+from ..config import PROMPT_DIFF_OPTIONS
 from ..validation import lint_commit_dict
-from .core import get_upstream_ref, is_tracked, run
-
-
-def get_commits_since_push(fallback_count=10):
+from .core import (
+    PATH_ERRORS,
+    get_upstream_ref,
+    is_tracked,
+    is_worktree_clean,
+    read_commit,
+    run,
+    run_parallel,
+    stream_records,
+)
+
+# Scratch ref for `git fast-import`; it is reset before the import ends, so
+# it is never actually created.
+_FAST_IMPORT_REF = "refs/auto-git/rewrite"
+
+
+def iter_commits_since_push(fallback_count=10):
     """
-    Get commit subjects since last push to upstream.
+    Like `get_commits_since_push`, but yield subjects lazily as git emits them.
 
     Returns:
-        Tuple of (source_description, list_of_subjects)
+        Tuple of (source_description, iterator_of_subjects)
     """
     upstream = get_upstream_ref()
     if upstream:
-        log_cmd = f"git log {upstream}..HEAD --pretty=format:%s"
+        log_args = [f"{upstream}..HEAD"]
         source_desc = f"commits since last push ({upstream}..HEAD)"
     else:
-        log_cmd = f"git log -{fallback_count} --pretty=format:%s"
+        log_args = [f"-{fallback_count}"]
         source_desc = f"last {fallback_count} commits (no upstream found)"
 
-    log_output = run(log_cmd)
-    lines = [line for line in log_output.splitlines() if line.strip()]
-    return source_desc, lines
+    # NUL-terminated records, read incrementally instead of buffering the log.
+    records = stream_records(["git", "log", "-z", "--format=%s", *log_args], sep=b"\0")
+    return source_desc, (subj.strip() for subj in records if subj.strip())
+
+
+def get_commits_since_push(fallback_count=10):
+    """
+    Get commit subjects since last push to upstream.
+
+    Returns:
+        Tuple of (source_description, list_of_subjects)
+    """
+    source_desc, subjects = iter_commits_since_push(fallback_count)
+    return source_desc, list(subjects)
+
+
+def _iter_log_records(argv):
+    """
+    Yield `(sha, subject, body, rest)` for each \\x1e-separated `git log` record.
+
+    Fields within a record are \\x1f-separated; `rest` is whatever follows the
+    body (the patch for `git log -p`), or "" if absent. Every field is
+    stripped. Records without at least a sha and subject are skipped with a
+    warning.
+    """
+    for record in stream_records(argv):
+        if not record.strip():
+            continue
+        parts = [part.strip() for part in record.split("\x1f", 3)]
+        if len(parts) < 2:
+            click.secho(f"Skipping malformed commit record: {record.strip()}", fg="yellow")
+            continue
+        parts.extend([""] * (4 - len(parts)))
+        yield tuple(parts)
 
 
 def get_unpushed_commits(max_count=20):
@@ -42,24 +87,17 @@ def get_unpushed_commits(max_count=20):
     if upstream:
         rev_range = f"{upstream}..HEAD"
         source_desc = f"unpushed commits ({rev_range})"
-        log_cmd = f'git log --reverse --first-parent --format="{log_format}" {rev_range}'
+        log_args = [rev_range]
     else:
         source_desc = f"last {max_count} commits (no upstream found)"
         # Use -n instead of HEAD~N..HEAD so this works even for short histories.
-        log_cmd = f'git log --reverse --first-parent -n {max_count} --format="{log_format}" HEAD'
-    raw = run(log_cmd)
-    commits = []
-    for record in raw.split("\x1e"):
-        if not record.strip():
-            continue
-        record = record.strip()
-        parts = record.split("\x1f")
-        if len(parts) < 2:
-            continue
-        sha = parts[0]
-        subj = parts[1]
-        body = parts[2] if len(parts) > 2 else ""
-        commits.append({"sha": sha, "subject": subj.strip(), "body": body.strip()})
+        log_args = ["-n", str(max_count), "HEAD"]
+    commits = [
+        {"sha": sha, "subject": subj, "body": body}
+        for sha, subj, body, _ in _iter_log_records(
+            ["git", "log", "--reverse", "--first-parent", f"--format={log_format}", *log_args]
+        )
+    ]
     return source_desc, commits
 
 
@@ -75,55 +113,130 @@ def get_commits_for_fix(max_count=20, force=False):
         Tuple of (source_description, list_of_commit_dicts_with_diffs)
     """
     upstream = get_upstream_ref()
-    log_format = "%H%x1f%s%x1f%b%x1e"
+    # One `git log -p` streams metadata and patches together, instead of a
+    # `git show` per commit, and is consumed record by record. Records are
+    # framed as \x1e<sha>\x1f<subj>\x1f<body>\x1f<diff>.
+    log_format = "%x1e%H%x1f%s%x1f%b%x1f"
 
     if upstream and not force:
         rev_range = f"{upstream}..HEAD"
         source_desc = f"unpushed commits ({rev_range})"
-        log_cmd = f'git log --reverse --first-parent --format="{log_format}" {rev_range}'
+        log_args = [rev_range]
     else:
         source_desc = f"last {max_count} commits"
         if force and upstream:
             source_desc += " (force enabled)"
         elif not upstream:
             source_desc += " (no upstream found)"
-        log_cmd = f'git log --reverse --first-parent -n {max_count} --format="{log_format}" HEAD'
+        log_args = ["-n", str(max_count), "HEAD"]
 
-    raw = run(log_cmd)
     commits = []
-    for record in raw.split("\x1e"):
-        if not record.strip():
-            continue
-        record = record.strip()
-        parts = record.split("\x1f")
-        if len(parts) < 2:
-            click.secho(f"Skipping malformed commit record: {record}", fg="yellow")
-            continue
-        sha = parts[0].strip()
-        subj = parts[1].strip()
-        body = parts[2].strip() if len(parts) > 2 else ""
-
+    for sha, subj, body, diff in _iter_log_records(
+        [
+            "git",
+            "log",
+            "-p",
+            *PROMPT_DIFF_OPTIONS,
+            "--reverse",
+            "--first-parent",
+            f"--format={log_format}",
+            *log_args,
+        ]
+    ):
         message = subj
         if body:
             message = f"{message}\n\n{body}"
 
-        try:
-            diff = run(f"git show {sha} --format=format:")
-        except subprocess.CalledProcessError as exc:
-            err_out = exc.output
-            if isinstance(err_out, (bytes, bytearray)):
-                decoded = err_out.decode("utf-8", errors="ignore")
-            else:
-                decoded = str(err_out or "")
-            click.secho(f"Skipping commit {sha}: git show failed", fg="yellow")
-            if decoded:
-                click.echo(decoded)
-            continue
-
         commits.append({"hash": sha, "message": message, "diff": diff})
     return source_desc, commits
 
 
+def _get_trees(shas):
+    """Return a {sha: tree_sha} map for `shas` via the persistent cat-file reader."""
+    return {sha: read_commit(sha)["tree"] for sha in shas}
+
+
+def _signing_enabled():
+    try:
+        return run(["git", "config", "--type=bool", "commit.gpgsign"]) == "true"
+    except subprocess.CalledProcessError:
+        # Unset (exit 1) or not a boolean.
+        return False
+
+
+def _write_commit_chain(entries, base_parent):
+    """
+    Create a linear chain of commits on top of `base_parent` in one process.
+
+    `entries` are `(tree_sha, subject, body)` tuples, oldest first. Returns the
+    sha of the last new commit, or `base_parent` if `entries` is empty. Like
+    `git commit-tree -m subject -m body`, the author and committer are the
+    current identities, but a single `git fast-import` writes every commit
+    instead of spawning `commit-tree` once per entry.
+
+    fast-import cannot sign commits, so with `commit.gpgsign` enabled the chain
+    is written with one `commit-tree` per entry instead, which signs each one
+    like the squash path does.
+    """
+    if not entries:
+        return base_parent
+    if _signing_enabled():
+        parent = base_parent
+        for tree_sha, subject, body in entries:
+            message = f"{subject}\n\n{body}\n" if body else f"{subject}\n"
+            parent_args = ["-p", parent] if parent else []
+            parent = run(["git", "commit-tree", tree_sha, *parent_args, "-F", "-"], input=message)
+        return parent
+    author, committer = run_parallel(
+        [["git", "var", "GIT_AUTHOR_IDENT"], ["git", "var", "GIT_COMMITTER_IDENT"]]
+    )
+    stream = []
+    for mark, (tree_sha, subject, body) in enumerate(entries, 1):
+        message = f"{subject}\n\n{body}\n" if body else f"{subject}\n"
+        data = message.encode("utf-8")
+        stream.append(
+            f"commit {_FAST_IMPORT_REF}\nmark :{mark}\n"
+            f"author {author}\ncommitter {committer}\n"
+            f"data {len(data)}\n".encode("utf-8")
+            + data
+        )
+        if mark > 1:
+            stream.append(f"from :{mark - 1}\n".encode("ascii"))
+        elif base_parent:
+            stream.append(f"from {base_parent}\n".encode("ascii"))
+        # An empty path replaces the whole root tree.
+        stream.append(f'M 040000 {tree_sha} ""\n\n'.encode("ascii"))
+    stream.append(f"get-mark :{len(entries)}\nreset {_FAST_IMPORT_REF}\n\n".encode("ascii"))
+    result = subprocess.run(
+        ["git", "fast-import", "--quiet", "--cat-blob-fd=1"],
+        input=b"".join(stream),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(
+            result.returncode, result.args, result.stderr.decode("utf-8", errors="ignore")
+        )
+    return result.stdout.decode("ascii").strip()
+
+
+def find_merges(first_sha, last_sha):
+    """
+    Return the merge commits on the first-parent range covering `first_sha..last_sha`.
+
+    With an upstream the range is everything since it (`@{u}..HEAD`); otherwise
+    it starts at the parent of `first_sha`. Returns rev-list output, empty if
+    the history is linear.
+    """
+    upstream = get_upstream_ref()
+    if upstream:
+        rev_range = f"{upstream}..HEAD"
+    else:
+        parents = read_commit(first_sha)["parents"]
+        rev_range = f"{parents[0] if parents else ''}..{last_sha}"
+    return run(["git", "rev-list", "--merges", "--first-parent", rev_range])
+
+
 def apply_fix_plan(commits, plan):
     """
     Apply the AI rewrite plan to the current commit range.
@@ -133,30 +246,38 @@ def apply_fix_plan(commits, plan):
     - mergeStrategy == "squash" OR single rewritten commit: squash range to one commit.
     - Equal commit counts: rewrite commit messages (same order/trees).
 
-    Unsupported (will abort): split/reorder where counts differ.
+    Unsupported (will abort): split/reorder where counts differ, and message
+    rewrites over a range that contains merges.
     """
-    status = run("git status --porcelain")
-    if status.strip():
-        raise RuntimeError("Working tree not clean; commit or stash changes first.")
-
     rewritten = plan.get("rewrittenCommits") or []
     merge_strategy = (plan.get("mergeStrategy") or "").strip().lower()
 
+    # Dropping or squashing replaces the whole range, merges included; only the
+    # one-for-one message rewrite has to refuse non-linear history.
+    drops = merge_strategy == "drop" and not rewritten
+    squashes = merge_strategy == "squash" or len(rewritten) == 1
+    check_merges = len(commits) > 1 and not (drops or squashes)
+
+    # The clean-tree and merge checks are independent read-only git calls, so
+    # they run side by side rather than one after the other.
+    merges = ""
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        clean_future = pool.submit(is_worktree_clean)
+        if commits:
+            first_sha = commits[0]["hash"]
+            parents = read_commit(first_sha)["parents"]
+            base_parent = parents[0] if parents else None
+
+        if check_merges:
+            merges = find_merges(commits[0]["hash"], commits[-1]["hash"])
+
+    if not clean_future.result():
+        raise RuntimeError("Working tree not clean; commit or stash changes first.")
+
     if not commits:
         return "noop"
 
-    first_sha = commits[0]["hash"]
-    parents_raw = run(f"git show -s --format=%P {first_sha}")
-    parents = parents_raw.split()
-    base_parent = parents[0] if parents else None
-
     # Refuse to rewrite merge history
-    upstream = get_upstream_ref()
-    if upstream:
-        rev_range = f"{upstream}..HEAD"
-    else:
-        rev_range = f"{base_parent or ''}..{commits[-1]['hash']}"
-    merges = run(f"git rev-list --merges --first-parent {rev_range}")
     if merges.strip():
         raise RuntimeError("History contains merges; linear rewrite only. Aborting.")
 
@@ -166,26 +287,26 @@ def apply_fix_plan(commits, plan):
         cmd_parts = ["git", "commit-tree", tree_sha]
         if parent_sha:
             cmd_parts.extend(["-p", parent_sha])
-        cmd_parts.extend(["-m", shlex.quote(title.strip())])
+        cmd_parts.extend(["-m", title.strip()])
         if body and body.strip():
-            cmd_parts.extend(["-m", shlex.quote(body.strip())])
-        return run(" ".join(cmd_parts))
+            cmd_parts.extend(["-m", body.strip()])
+        return run(cmd_parts)
 
     # Handle drop
-    if merge_strategy == "drop" and not rewritten:
+    if drops:
         if not base_parent:
             raise RuntimeError("Cannot drop range without a parent commit.")
-        run(f"git reset --hard {base_parent}")
+        run(["git", "reset", "--hard", base_parent])
         return "dropped"
 
     # Handle squash (or single rewrite entry)
-    if merge_strategy == "squash" or len(rewritten) == 1:
+    if squashes:
         entry = rewritten[0] if rewritten else {"title": "Rewrite commits", "description": ""}
         title = entry.get("title") or "Rewrite commits"
         body = entry.get("description") or ""
-        tree_sha = run("git show -s --format=%T HEAD")
+        tree_sha = read_commit("HEAD")["tree"]
         new_sha = _commit_tree(tree_sha, base_parent, title, body)
-        run(f"git reset --hard {new_sha}")
+        run(["git", "reset", "--hard", new_sha])
         return "squashed"
 
     # If counts differ, we cannot safely rewrite (split/reorder unsupported).
@@ -196,28 +317,55 @@ def apply_fix_plan(commits, plan):
         )
 
     # Rewrite messages with same trees/order
-    last_new = base_parent
+    trees = _get_trees([orig["hash"] for orig in commits])
+    chain = []
     for entry, orig in zip(rewritten, commits, strict=True):
         title = (entry.get("title") or "").strip()
+        if not title:
+            raise RuntimeError("Rewrite plan provided an empty commit title.")
         body = (entry.get("description") or "").strip()
-        tree_sha = run(f"git show -s --format=%T {orig['hash']}")
-        last_new = _commit_tree(tree_sha, last_new, title, body)
+        chain.append((trees[orig["hash"]], title, body))
+    last_new = _write_commit_chain(chain, base_parent)
 
     if not last_new:
         raise RuntimeError("Failed to compute new commit chain.")
 
-    run(f"git reset --hard {last_new}")
+    run(["git", "reset", "--hard", last_new])
     return "rewritten"
 
 
-def apply_commits(commit_list):
+def _error_output(exc):
+    err_out = exc.output
+    if isinstance(err_out, (bytes, bytearray)):
+        return err_out.decode("utf-8", errors="ignore")
+    return str(err_out or "")
+
+
+def _stage_paths(paths):
+    # Use -A to ensure deletions are staged too; plain git add errors on removed
+    # paths. Paths go over stdin so large commits cannot overflow ARG_MAX.
+    run(
+        ["git", "add", "-A", "--pathspec-from-file=-", "--pathspec-file-nul"],
+        input="\0".join(paths),
+        errors=PATH_ERRORS,
+    )
+
+
+def apply_commits(commit_list, show_log=True):
     """
     Apply a list of commit dictionaries by staging files and committing.
 
     Each commit dict should have: type, title, body (optional), files
+
+    Returns the subjects that were committed. Unless `show_log` is False, the
+    commits since the last push are printed afterwards (`print_commit_log`).
+
+    All paths in the plan are staged with a single `git add`; each commit then
+    records only its own paths (`git commit --only`), so changes staged for a
+    later commit, or staged beforehand outside the plan, never leak into it.
     """
 
-    committed_subjects = []
+    planned = []
     for commit in commit_list:
         files = commit.get("files", [])
         if not files:
@@ -250,56 +398,75 @@ def apply_commits(commit_list):
             )
             continue
 
-        try:
-            # Use -A to ensure deletions are staged too; plain git add errors on removed paths
-            run(["git", "add", "-A", "--", *stage_targets])
-        except subprocess.CalledProcessError as exc:
-            err_out = exc.output
-            if isinstance(err_out, (bytes, bytearray)):
-                decoded = err_out.decode("utf-8", errors="ignore")
-            else:
-                decoded = str(err_out or "")
-            click.secho(
-                f"Staging failed for files: {', '.join(stage_targets)}; skipping this commit.",
-                fg="red",
-            )
-            if decoded:
-                click.echo(decoded)
-            continue
+        planned.append((subject, body, stage_targets))
+
+    # Stage the whole plan at once; if that fails (e.g. one bad path), fall back
+    # to staging per commit so the other commits can still go through.
+    all_targets = list(dict.fromkeys(f for _, _, targets in planned for f in targets))
+    try:
+        if all_targets:
+            _stage_paths(all_targets)
+        staged_all = True
+    except subprocess.CalledProcessError:
+        staged_all = False
 
-        cmd = ["git", "commit", "-m", subject]
+    committed_subjects = []
+    for subject, body, stage_targets in planned:
+        if not staged_all:
+            try:
+                _stage_paths(stage_targets)
+            except subprocess.CalledProcessError as exc:
+                decoded = _error_output(exc)
+                click.secho(
+                    f"Staging failed for files: {', '.join(stage_targets)}; "
+                    "skipping this commit.",
+                    fg="red",
+                )
+                if decoded:
+                    click.echo(decoded)
+                continue
+
+        cmd = ["git", "commit", "--pathspec-from-file=-", "--pathspec-file-nul", "-m", subject]
         if body and body.strip():
             cmd.extend(["-m", body])
 
         try:
-            run(cmd)
+            run(cmd, input="\0".join(stage_targets), errors=PATH_ERRORS)
             committed_subjects.append(subject)
         except subprocess.CalledProcessError as exc:
-            err_out = exc.output
-            if isinstance(err_out, (bytes, bytearray)):
-                decoded = err_out.decode("utf-8", errors="ignore")
-            else:
-                decoded = str(err_out or "")
+            decoded = _error_output(exc)
             click.secho("Commit failed; skipping remaining steps for this commit.", fg="red")
             if decoded:
                 click.echo(decoded)
 
     if committed_subjects:
         click.secho(f"✔ Committed: {', '.join(committed_subjects)}", fg="green", bold=True)
-        # Show newest-first commits since last push so the just-added commit is on top
-        source_desc, commits = get_commits_since_push()
-        divider = click.style("─" * 48, fg="blue")
-        click.echo(divider)
-        click.secho(" Commit log (newest first) ", fg="cyan", bold=True, nl=False)
-        click.echo()
-        click.echo(f"Source: {source_desc}")
-        if commits:
-            pad = len(str(len(commits)))
-            for idx, csubj in enumerate(commits, 1):
-                click.echo(f"  {idx:>{pad}}. {csubj}")
-        else:
-            click.echo("  (none)")
-        click.echo(divider)
+        if show_log:
+            print_commit_log()
+    return committed_subjects
+
+
+def print_commit_log():
+    """
+    Print the commits since the last push, newest first.
+
+    The block is written with a single echo so output from other threads
+    (e.g. watcher status lines) cannot land in the middle of it.
+    """
+    source_desc, commits = get_commits_since_push()
+    divider = click.style("─" * 48, fg="blue")
+    lines = [
+        divider,
+        click.style(" Commit log (newest first) ", fg="cyan", bold=True),
+        f"Source: {source_desc}",
+    ]
+    if commits:
+        pad = len(str(len(commits)))
+        lines.extend(f"  {idx:>{pad}}. {csubj}" for idx, csubj in enumerate(commits, 1))
+    else:
+        lines.append("  (none)")
+    lines.append(divider)
+    click.echo("\n".join(lines))
 
 
 def rewrite_commits(amendments, allow_dirty=False):
@@ -313,8 +480,7 @@ def rewrite_commits(amendments, allow_dirty=False):
     Returns:
         The new HEAD sha, or None if no amendments
     """
-    status = run("git status --porcelain")
-    if status.strip() and not allow_dirty:
+    if not allow_dirty and not is_worktree_clean():
         raise RuntimeError(
             "Working tree not clean; commit or stash before rewriting, or pass allow_dirty=True"
         )
@@ -323,28 +489,22 @@ def rewrite_commits(amendments, allow_dirty=False):
         return None
 
     first_sha = amendments[0]["sha"]
-    parents_raw = run(f"git show -s --format=%P {first_sha}")
-    parents = parents_raw.split()
+    parents = read_commit(first_sha)["parents"]
     base_parent = parents[0] if parents else None
 
-    last_new = base_parent
-    for entry in amendments:
-        sha = entry["sha"]
-        subject = entry.get("subject", "").strip()
-        body = (entry.get("body") or "").strip()
-
-        tree = run(f"git show -s --format=%T {sha}")
-        cmd_parts = ["git", "commit-tree", tree]
-        if last_new:
-            cmd_parts.extend(["-p", last_new])
-        cmd_parts.extend(["-m", shlex.quote(subject)])
-        if body:
-            cmd_parts.extend(["-m", shlex.quote(body)])
-        new_sha = run(" ".join(cmd_parts))
-        last_new = new_sha
+    trees = _get_trees([entry["sha"] for entry in amendments])
+    chain = [
+        (
+            trees[entry["sha"]],
+            entry.get("subject", "").strip(),
+            (entry.get("body") or "").strip(),
+        )
+        for entry in amendments
+    ]
+    last_new = _write_commit_chain(chain, base_parent)
 
     if not last_new:
         raise RuntimeError("Failed to compute new commit chain.")
 
-    run(f"git reset --hard {last_new}")
+    run(["git", "reset", "--hard", last_new])
     return last_new
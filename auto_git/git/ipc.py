@@ -0,0 +1,174 @@
+"""Long-lived git helper processes that answer many queries over one pipe."""
+
+import atexit
+import subprocess
+import threading
+
+
+class GitWorkerError(RuntimeError):
+    """Raised when a persistent git helper exits or stops responding."""
+
+
+class _GitWorker:
+    """Base for a persistent `git ... --stdin` process, restarted on demand."""
+
+    argv = ()
+
+    def __init__(self, cwd=None):
+        self._cwd = cwd
+        self._proc = None
+        self._buf = b""
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        if self._proc is None or self._proc.poll() is not None:
+            self._buf = b""
+            self._proc = subprocess.Popen(
+                list(self.argv),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                cwd=self._cwd,
+            )
+        return self._proc
+
+    def _send(self, data):
+        proc = self._ensure_started()
+        try:
+            proc.stdin.write(data)
+            proc.stdin.flush()
+        except (BrokenPipeError, OSError) as exc:
+            self._kill()
+            raise GitWorkerError(f"{self.argv[1]} worker exited") from exc
+
+    def _read_until(self, sep):
+        while True:
+            idx = self._buf.find(sep)
+            if idx != -1:
+                out, self._buf = self._buf[:idx], self._buf[idx + len(sep) :]
+                return out
+            chunk = self._proc.stdout.read1(65536)
+            if not chunk:
+                self._kill()
+                raise GitWorkerError(f"{self.argv[1]} worker exited")
+            self._buf += chunk
+
+    def _read_exact(self, size):
+        while len(self._buf) < size:
+            chunk = self._proc.stdout.read1(max(65536, size - len(self._buf)))
+            if not chunk:
+                self._kill()
+                raise GitWorkerError(f"{self.argv[1]} worker exited")
+            self._buf += chunk
+        out, self._buf = self._buf[:size], self._buf[size:]
+        return out
+
+    def _kill(self):
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+    def close(self):
+        """Shut the helper process down; it is restarted on the next query."""
+        with self._lock:
+            proc, self._proc = self._proc, None
+            if proc is None:
+                return
+            try:
+                proc.stdin.close()
+                proc.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                proc.kill()
+                proc.wait()
+
+
+class CheckIgnoreBatch(_GitWorker):
+    """
+    Persistent `git check-ignore --stdin` process.
+
+    Answers one path per round trip without forking git for every query. Like
+    `git check-ignore`, tracked files are never reported as ignored.
+    """
+
+    argv = ("git", "check-ignore", "--stdin", "-z", "--verbose", "--non-matching")
+
+    def is_ignored(self, path):
+        """Return True if `path` (relative to the worker's cwd) is ignored."""
+        with self._lock:
+            self._send(path.encode("utf-8", errors="surrogateescape") + b"\0")
+            source = self._read_until(b"\0")
+            _linenum = self._read_until(b"\0")
+            pattern = self._read_until(b"\0")
+            _path = self._read_until(b"\0")
+        # A match on a negated pattern means the path is explicitly re-included.
+        return bool(source) and not pattern.startswith(b"!")
+
+
+class CatFileBatchCheck(_GitWorker):
+    """
+    Persistent `git cat-file --batch-check` process for existence checks.
+
+    Only the object header comes back, so large blobs are never read.
+    """
+
+    argv = ("git", "cat-file", "--batch-check")
+
+    def exists(self, rev):
+        """Return True if `rev` (e.g. `":path"` for an index entry) names an object."""
+        if "\n" in rev:
+            raise GitWorkerError("Object names cannot contain newlines")
+        with self._lock:
+            self._send(rev.encode("utf-8", errors="surrogateescape") + b"\n")
+            header = self._read_until(b"\n").split()
+        # `<oid> <type> <size>`, or `<rev> missing` / `<rev> ambiguous`.
+        return len(header) == 3
+
+
+class CatFileBatch(_GitWorker):
+    """
+    Persistent `git cat-file --batch` process for reading objects by name.
+
+    Saves a `git show`/`rev-parse` spawn per lookup when walking many commits.
+    """
+
+    argv = ("git", "cat-file", "--batch")
+
+    def _request(self, rev):
+        # Returns (oid, type, content) or None for a missing/ambiguous name.
+        with self._lock:
+            self._send(rev.encode("utf-8") + b"\n")
+            header = self._read_until(b"\n").split()
+            if len(header) != 3:
+                # `<rev> missing` / `<rev> ambiguous`
+                return None
+            oid, obj_type, size = header
+            content = self._read_exact(int(size) + 1)[:-1]
+        return oid.decode("ascii"), obj_type.decode("ascii"), content
+
+    def read_object(self, rev):
+        """Return `(type, content_bytes)` for `rev`, or None if it does not exist."""
+        obj = self._request(rev)
+        return None if obj is None else obj[1:]
+
+    def resolve(self, rev):
+        """Return the object id `rev` names, or None if it does not exist."""
+        obj = self._request(rev)
+        return None if obj is None else obj[0]
+
+    def read_commit(self, rev):
+        """Return `{"tree": sha, "parents": [sha, ...]}` for the commit `rev`."""
+        obj = self.read_object(rev)
+        if obj is None or obj[0] != "commit":
+            raise GitWorkerError(f"Not a commit: {rev}")
+        tree, parents = None, []
+        for line in obj[1].split(b"\n"):
+            if not line:
+                break
+            key, _, value = line.partition(b" ")
+            if key == b"tree":
+                tree = value.decode("ascii")
+            elif key == b"parent":
+                parents.append(value.decode("ascii"))
+        return {"tree": tree, "parents": parents}
@@ -1,21 +1,61 @@
 """Display utilities and UI helpers."""
 
-import time
+import itertools
+import sys
+import threading
+from contextlib import contextmanager
 
 import click
 
+SPINNER_FRAMES = "|/-\\"
+
 
 def display_spinning_animation(message="Watching for changes... (Ctrl+C to stop)"):
-    """Display a spinning animation with a message."""
-    animation = "|/-\\"
-    spin_cycles = 24
-    for i in range(spin_cycles):
-        frame = animation[i % len(animation)]
-        click.echo(f"\r{message} {frame}", nl=False)
-        time.sleep(0.05)
+    """Display a status message without blocking the caller."""
     click.echo(f"\r{message}    \n")
 
 
+@contextmanager
+def spinner(message):
+    """
+    Animate `message` on a background thread while the body of the block runs.
+
+    The animation stops as soon as the block exits, so it never adds latency of
+    its own. Non-interactive output just gets the message once.
+
+    The block receives an `update(detail)` callable; `detail` (e.g. progress of
+    a streamed response) is shown after the spinner on the next frame.
+    """
+    if not sys.stdout.isatty():
+        click.echo(message)
+        yield lambda detail: None
+        return
+
+    stop = threading.Event()
+    state = {"detail": ""}
+
+    def _update(detail):
+        state["detail"] = detail
+
+    def _spin():
+        width = 0
+        for frame in itertools.cycle(SPINNER_FRAMES):
+            line = f"{message} {frame} {state['detail']}".rstrip()
+            width = max(width, len(line))
+            click.echo(f"\r{line.ljust(width)}", nl=False)
+            if stop.wait(0.1):
+                break
+        click.echo(f"\r{message.ljust(width)}")
+
+    thread = threading.Thread(target=_spin, daemon=True)
+    thread.start()
+    try:
+        yield _update
+    finally:
+        stop.set()
+        thread.join()
+
+
 def format_commit_preview(commits):
     """Format a list of commits for preview display."""
     lines = []
@@ -1,6 +1,44 @@
 """Linting and validation functions for commits."""
 
-from .config import COMMIT_SUBJECT_RE, COMMIT_TYPES
+from functools import lru_cache
+
+from .config import COMMIT_TYPES
+
+
+# Plans are re-linted on cache hits, previews and again in apply_commits, so the
+# same subjects come through repeatedly; the check is pure and cheap to memoize.
+@lru_cache(maxsize=1024)
+def _valid_subject(subject):
+    """
+    Check `<type>(<scope>): <subject>` without the regex engine.
+
+    The type is a set lookup, the optional scope is any non-empty text closed
+    by `): `, and no part of the line may contain a newline (a single trailing
+    newline is tolerated).
+    """
+    if subject.endswith("\n"):
+        subject = subject[:-1]
+    if "\n" in subject:
+        return False
+
+    colon = subject.find(":")
+    paren = subject.find("(")
+    if colon == -1:
+        return False
+
+    if paren == -1 or colon < paren:
+        # No scope: `<type>: <text>`
+        return (
+            subject[:colon] in COMMIT_TYPES
+            and subject.startswith(" ", colon + 1)
+            and len(subject) > colon + 2
+        )
+
+    # Scoped: `<type>(<scope>): <text>`, scope non-empty.
+    if subject[:paren] not in COMMIT_TYPES:
+        return False
+    close = subject.find("): ", paren + 2)
+    return close != -1 and len(subject) > close + 3
 
 
 def lint_commit_dict(commit):
@@ -26,8 +64,10 @@ def lint_commit_dict(commit):
     if not isinstance(files, list) or not files:
         raise ValueError("Commit files are required")
 
+    # The type is already known to be valid, so only the title part of the
+    # subject format is left to check: a single line.
     subject = f"{ctype}: {title}"
-    if not COMMIT_SUBJECT_RE.match(subject):
+    if "\n" in (title[:-1] if title.endswith("\n") else title):
         raise ValueError("Commit title must match the format: <type>(<scope>): <subject>")
 
     if body is not None and not isinstance(body, str):
@@ -42,5 +82,5 @@ def lint_git_commit_subject(subject):
 
     Raises ValueError if validation fails.
     """
-    if not COMMIT_SUBJECT_RE.match(subject):
+    if not _valid_subject(subject):
         raise ValueError("Commit subject must match the format: <type>(<scope>): <subject>")
@@ -1,14 +1,68 @@
 """File system watcher for automatic commits."""
 
+import hashlib
+import os
 import threading
 import time
 
 from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
+
+from .config import (
+    NETWORK_FS_TYPES,
+    WATCH_BACKOFF_FACTOR,
+    WATCH_POLL_INTERVAL_SECONDS,
+)
+
+
+def is_network_mount(path=".", mounts_file="/proc/mounts"):
+    """
+    Best-effort check whether `path` lives on a network filesystem.
+
+    Native change notifications are unreliable there (NFS/CIFS deliver few or
+    no inotify events). Reads /proc/mounts, so it is always False off Linux.
+    """
+    target = os.path.realpath(path)
+    best_mount, best_type = "", None
+    try:
+        with open(mounts_file, "r") as mounts:
+            for line in mounts:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace("\\040", " ")
+                inside = target == mount_point or target.startswith(mount_point.rstrip("/") + "/")
+                # The longest matching mount point is the one that holds `path`.
+                if inside and len(mount_point) >= len(best_mount):
+                    best_mount, best_type = mount_point, fields[2]
+    except OSError:
+        return False
+    return best_type in NETWORK_FS_TYPES
+
+
+def make_observer(poll=None, poll_interval=WATCH_POLL_INTERVAL_SECONDS, path="."):
+    """
+    Build the watchdog observer for `path`.
+
+    Native OS notifications are used unless `poll` is True. With `poll=None`,
+    polling is chosen automatically for network mounts. Polling re-scans the
+    tree every `poll_interval` seconds, so keep it large on big repositories.
+    """
+    if poll is None:
+        poll = is_network_mount(path)
+    if poll:
+        return PollingObserver(timeout=poll_interval)
+    return Observer()
 
 
 class ChangeHandler(FileSystemEventHandler):
     """Handler for file system change events that triggers AI commits."""
 
+    IGNORE_CACHE_SIZE = 4096
+    # Events that never change file contents.
+    IGNORED_EVENT_TYPES = frozenset({"opened", "closed", "closed_no_write"})
+
     def __init__(
         self,
         ignore_dirs=None,
@@ -17,13 +71,24 @@ class ChangeHandler(FileSystemEventHandler):
         interval_seconds=0,
         clock=None,
         timer_factory=None,
+        debounce_seconds=0,
     ):
         self.ignore_dirs = ignore_dirs or []
+        # Events are matched against absolute prefixes with one str.startswith
+        # call instead of normalizing every path with os.path.relpath.
+        root = self._root = os.path.abspath(".")
+        self._root_prefix = os.path.join(root, "")
+        self._ignore_prefixes = tuple(
+            os.path.join(root, d.rstrip("/" + os.sep), "") for d in self.ignore_dirs
+        )
         self.stop_event = stop_event
         self.status_cooldown = status_cooldown
         self._last_status_message = None
         self._last_status_time = 0
         self.interval_seconds = max(0, int(interval_seconds or 0))
+        # Quiet period required after the last event before a run starts, so a
+        # burst of saves is processed once.
+        self.debounce_seconds = max(0.0, float(debounce_seconds or 0))
 
         # Injection points for deterministic tests.
         self._clock = clock or time.time
@@ -35,7 +100,15 @@ class ChangeHandler(FileSystemEventHandler):
         self._processing = False
         self._timer = None
         self._last_run_time = 0.0
+        # Earliest start for the next run after a slow one (see _next_window_locked).
+        self._backoff_until = 0.0
         self._next_run_time = None
+        self._last_event_time = 0.0
+
+        # Ignore status per path; editors touch the same few files repeatedly.
+        self._ignored_cache = {}
+        # Hash of the last staged diff that was planned and applied.
+        self._last_diff_hash = None
 
     def _show_status(self, message):
         now = self._clock()
@@ -71,6 +144,18 @@ class ChangeHandler(FileSystemEventHandler):
         self._timer = t
         t.start()
 
+    def _next_window_locked(self, now):
+        """
+        Return when the next interval run may start. Must be called with `_lock` held.
+
+        Runs start at most every `interval_seconds`. After a slow run (git or
+        the OpenAI round trip taking a while), the next one also waits
+        `WATCH_BACKOFF_FACTOR` times that run's duration after it finished.
+        """
+        if self._last_run_time <= 0:
+            return now + self.interval_seconds
+        return max(self._last_run_time + self.interval_seconds, self._backoff_until)
+
     def _process_pending(self):
         import auto_git as ag
 
@@ -90,16 +175,21 @@ class ChangeHandler(FileSystemEventHandler):
                 # changes arrive during/after a run). This avoids repeatedly
                 # "re-initializing" the first run window.
                 if self._next_run_time is None:
-                    if self._last_run_time > 0:
-                        self._next_run_time = self._last_run_time + self.interval_seconds
-                    else:
-                        self._next_run_time = now + self.interval_seconds
+                    self._next_run_time = self._next_window_locked(now)
 
                 if now < self._next_run_time:
                     self._timer = None
                     self._schedule_locked(self._next_run_time - now)
                     return
 
+            if self.debounce_seconds > 0:
+                quiet_until = self._last_event_time + self.debounce_seconds
+                if now < quiet_until:
+                    # Events are still arriving; wait for them to settle.
+                    self._timer = None
+                    self._schedule_locked(quiet_until - now)
+                    return
+
             self._processing = True
             self._pending = False
             self._last_run_time = now
@@ -108,9 +198,11 @@ class ChangeHandler(FileSystemEventHandler):
 
         should_stop = False
         try:
+            # Refs may have moved (push, checkout) since the last cycle.
+            ag.clear_git_cache()
             self._show_status("Checking for changes...")
             # Stage everything (we then split by AI into multiple commits)
-            ag.run("git add -A")
+            ag.run(["git", "add", "-A"])
 
             files = ag.get_changed_files(staged=True, unstaged=False)
             if not files:
@@ -118,53 +210,87 @@ class ChangeHandler(FileSystemEventHandler):
                 return
 
             diff = ag.get_diff(files, staged=True, unstaged=False)
+            diff_hash = hashlib.sha256(diff.encode("utf-8")).hexdigest()
+            if diff_hash == self._last_diff_hash:
+                # Same staged content as last time (e.g. the AI skipped it); don't re-plan.
+                self._show_status("No new changes since last check...")
+                return
             commits = ag.ask_openai_for_commits(files, diff)
-            ag.apply_commits(commits)
+            committed = ag.apply_commits(commits, show_log=False)
+            self._last_diff_hash = diff_hash
+            if committed and not (self.stop_event and self.stop_event.is_set()):
+                # The log is informational; print it off the processing path so
+                # the next cycle is not held up by another `git log`.
+                threading.Thread(target=ag.print_commit_log, daemon=True).start()
         finally:
             with self._lock:
                 self._processing = False
+                finished = self._clock()
+                self._backoff_until = finished + WATCH_BACKOFF_FACTOR * (
+                    finished - self._last_run_time
+                )
                 should_stop = bool(self.stop_event and self.stop_event.is_set())
                 if self._pending and not should_stop:
                     # Coalesce further events into the next interval window.
                     if self.interval_seconds > 0:
-                        now = self._clock()
-                        self._next_run_time = self._last_run_time + self.interval_seconds
-                        self._schedule_locked(max(0.0, self._next_run_time - now))
+                        self._next_run_time = self._next_window_locked(finished)
+                        self._schedule_locked(max(0.0, self._next_run_time - finished))
                     else:
                         self._schedule_locked(0.0)
         if should_stop:
             return
 
-    def on_any_event(self, event):
-        import os
-
+    def _is_ignored(self, path):
         import auto_git as ag
 
+        if os.path.basename(path) == ".gitignore":
+            # Ignore rules changed; earlier answers may be stale.
+            self._ignored_cache.clear()
+        ignored = self._ignored_cache.get(path)
+        if ignored is None:
+            if len(self._ignored_cache) >= self.IGNORE_CACHE_SIZE:
+                self._ignored_cache.clear()
+            ignored = self._ignored_cache[path] = ag.is_git_ignored(path, root=self._root)
+        return ignored
+
+    def on_any_event(self, event):
         if self.stop_event and self.stop_event.is_set():
             return
-        rel_path = os.path.relpath(event.src_path, ".")
-        for d in self.ignore_dirs:
-            if rel_path.startswith(d):
-                return
-        if ag.is_git_ignored(event.src_path):
+        # Directory events duplicate the file events under them, and open/close
+        # notifications carry no content change.
+        if getattr(event, "is_directory", False):
+            return
+        if getattr(event, "event_type", None) in self.IGNORED_EVENT_TYPES:
+            return
+        src_path = event.src_path
+        if not src_path.startswith(self._root_prefix):
+            src_path = os.path.abspath(src_path)
+        if src_path.startswith(self._ignore_prefixes):
+            return
+        # Dependency directories such as node_modules are usually gitignored and
+        # dropped here; when they are tracked, their edits are real changes.
+        if self._is_ignored(event.src_path):
             return
 
         # When interval is set, debounce/collect changes so we don't create commits
         # on every filesystem event.
         with self._lock:
             self._pending = True
+            now = self._clock()
+            self._last_event_time = now
             if self.interval_seconds > 0:
-                now = self._clock()
                 if self._next_run_time is None:
-                    if self._last_run_time > 0:
-                        self._next_run_time = self._last_run_time + self.interval_seconds
-                    else:
-                        self._next_run_time = now + self.interval_seconds
-                self._show_status(
-                    f"Change detected; next check in {max(0, int(self._next_run_time - now))}s..."
-                )
+                    self._next_run_time = self._next_window_locked(now)
+                    # Announce the window once rather than on every event in it.
+                    self._show_status(
+                        "Change detected; next check in "
+                        f"{max(0, int(self._next_run_time - now))}s..."
+                    )
                 self._schedule_locked(self._next_run_time - now)
                 return
+            if self.debounce_seconds > 0:
+                self._schedule_locked(self.debounce_seconds)
+                return
 
         # Default behavior (interval=0): process immediately (backwards compatible).
         self._process_pending()
@@ -1,3 +1,4 @@
+import shlex
 import subprocess
 from pathlib import Path
 
@@ -11,7 +12,8 @@ def tmp_git_repo(tmp_path):
     repo.mkdir()
 
     def git(cmd):
-        subprocess.check_call(f"git -C {repo} {cmd}", shell=True)
+        # Split like a shell would, but exec git directly without spawning one.
+        subprocess.check_call(["git", "-C", str(repo), *shlex.split(cmd)])
 
     git("init")
     git('config user.email "test@example.com"')
@@ -19,6 +21,12 @@ def tmp_git_repo(tmp_path):
     return repo, git
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(monkeypatch, tmp_path):
+    """Keep the response and file-plan caches out of the real home directory."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg-cache"))
+
+
 @pytest.fixture(autouse=True)
 def clear_openai_key(monkeypatch):
     """Ensure OPEN_AI_API_KEY is absent during tests."""
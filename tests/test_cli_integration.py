@@ -1,6 +1,8 @@
 import json
+import os
 import subprocess
 
+import pytest
 from click.testing import CliRunner
 
 import auto_git as ag
@@ -64,7 +66,7 @@ def test_amend_unpushed_dry_run(monkeypatch, tmp_git_repo, write_file):
     ]
 
     monkeypatch.chdir(repo)
-    monkeypatch.setattr(ag, "ask_openai_for_amendments", lambda commits: amendments)
+    monkeypatch.setattr(ag, "ask_openai_for_amendments", lambda commits, batch=False: amendments)
 
     runner = CliRunner()
     result = runner.invoke(ag.cli, ["amend_unpushed", "--dry-run"])
@@ -90,3 +92,474 @@ def test_apply_commits_stages_paths_with_parentheses(monkeypatch, tmp_git_repo,
     )
     assert path in names.splitlines()
 
+
+def test_get_commits_for_fix_reads_diffs_in_one_pass(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, "a.txt", "one")
+    git("add a.txt")
+    git('commit -m "feat: add a" -m "with body"')
+    write_file(repo, "b.txt", "two")
+    git("add b.txt")
+    git('commit -m "feat: add b"')
+
+    monkeypatch.chdir(repo)
+    _, commits = ag.get_commits_for_fix(max_count=5)
+
+    assert [c["message"] for c in commits] == ["feat: add a\n\nwith body", "feat: add b"]
+    assert commits[0]["diff"].startswith("diff --git a/a.txt b/a.txt")
+    assert "+one" in commits[0]["diff"]
+    assert "b.txt" not in commits[0]["diff"]
+    assert "+two" in commits[1]["diff"]
+
+
+def test_apply_fix_plan_checks_tree_then_rewrites(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, "base.txt", "base")
+    git("add base.txt")
+    git('commit -m "chore: base"')
+    for name in ("a", "b"):
+        write_file(repo, f"{name}.txt", name)
+        git(f"add {name}.txt")
+        git(f'commit -m "wip {name}"')
+
+    monkeypatch.chdir(repo)
+    _, commits = ag.get_commits_for_fix(max_count=2)
+    plan = {
+        "rewrittenCommits": [
+            {"title": "feat: add a", "description": ""},
+            {"title": "feat: add b", "description": ""},
+        ]
+    }
+
+    write_file(repo, "a.txt", "dirty")
+    with pytest.raises(RuntimeError, match="not clean"):
+        ag.apply_fix_plan(commits, plan)
+    git("checkout -- a.txt")
+
+    assert ag.apply_fix_plan(commits, plan) == "rewritten"
+    log = ag.run(["git", "log", "--format=%s"]).splitlines()
+    assert log == ["feat: add b", "feat: add a", "chore: base"]
+
+
+def test_find_merges_walks_first_parent_range(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, "base.txt", "base")
+    git("add base.txt")
+    git('commit -m "chore: base"')
+    git("checkout -q -b side")
+    write_file(repo, "side.txt", "side")
+    git("add side.txt")
+    git('commit -m "feat: side"')
+    git("checkout -q -")
+    write_file(repo, "main.txt", "main")
+    git("add main.txt")
+    git('commit -m "feat: main"')
+
+    monkeypatch.chdir(repo)
+    head = ag.run(["git", "rev-parse", "HEAD"])
+    assert ag.git.find_merges(head, head) == ""
+
+    git('merge -q --no-ff side -m "merge side"')
+    merge = ag.run(["git", "rev-parse", "HEAD"])
+    assert ag.git.find_merges(head, merge) == merge
+
+
+def test_apply_fix_plan_squash_skips_merge_scan(monkeypatch, tmp_git_repo, write_file):
+    from auto_git.git import history
+
+    repo, git = tmp_git_repo
+    write_file(repo, "base.txt", "base")
+    git("add base.txt")
+    git('commit -m "chore: base"')
+    for name in ("a", "b"):
+        write_file(repo, f"{name}.txt", name)
+        git(f"add {name}.txt")
+        git(f'commit -m "wip {name}"')
+
+    monkeypatch.chdir(repo)
+    _, commits = ag.get_commits_for_fix(max_count=2)
+    calls = []
+    real_run = history.run
+    monkeypatch.setattr(history, "run", lambda cmd, **kw: calls.append(cmd) or real_run(cmd, **kw))
+
+    plan = {"mergeStrategy": "squash", "rewrittenCommits": [{"title": "feat: add a and b"}]}
+    assert ag.apply_fix_plan(commits, plan) == "squashed"
+    assert not any(cmd[:2] == ["git", "rev-list"] for cmd in calls)
+    assert ag.run(["git", "log", "--format=%s"]).splitlines() == [
+        "feat: add a and b",
+        "chore: base",
+    ]
+
+
+def test_is_git_ignored_reuses_check_ignore_worker(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, ".gitignore", "*.log\n!keep.log\n")
+    write_file(repo, "debug.log", "x")
+    write_file(repo, "keep.log", "x")
+    write_file(repo, "main.py", "x")
+
+    monkeypatch.chdir(repo)
+    assert ag.is_git_ignored("debug.log") is True
+    assert ag.is_git_ignored("keep.log") is False
+    assert ag.is_git_ignored("main.py") is False
+    assert ag.is_git_ignored(".git/HEAD") is True
+    assert ag.is_git_ignored(".gitignore") is False
+    assert ag.is_git_ignored(".github/workflows/ci.yml") is False
+    assert ag.is_git_ignored("/definitely/outside/repo.log") is False
+
+    # With an explicit root the answer does not depend on the current directory.
+    monkeypatch.chdir(repo.parent)
+    assert ag.is_git_ignored(str(repo / "debug.log"), root=str(repo)) is True
+    assert ag.is_git_ignored(".git/HEAD", root=str(repo)) is True
+    assert ag.is_git_ignored("main.py", root=str(repo)) is False
+
+
+def test_get_changed_files_dedupes_and_keeps_odd_names(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, "both.txt", "one")
+    git("add both.txt")
+    write_file(repo, "both.txt", "two")
+    write_file(repo, "café\nnotes.txt", "x")
+
+    monkeypatch.chdir(repo)
+    files = ag.get_changed_files(staged=True, unstaged=True, untracked=True)
+
+    assert files == ["both.txt", "café\nnotes.txt"]
+
+
+@pytest.mark.parametrize("signed", [False, True])
+def test_rewrite_commits_keeps_trees(monkeypatch, tmp_git_repo, write_file, signed):
+    from auto_git.git import history
+
+    repo, git = tmp_git_repo
+    for content in ("first", "second"):
+        write_file(repo, "file.txt", content)
+        git("add file.txt")
+        git(f'commit -m "feat: {content}"')
+
+    def log(fmt):
+        return subprocess.check_output(
+            ["git", "-C", str(repo), "log", "--reverse", f"--format={fmt}"], text=True
+        ).splitlines()
+
+    shas, trees = log("%H"), log("%T")
+    monkeypatch.chdir(repo)
+    assert history._signing_enabled() is False
+    git("config commit.gpgsign true")
+    assert history._signing_enabled() is True
+    git("config commit.gpgsign false")
+    # No key is available here, so only the commit-tree code path is exercised.
+    monkeypatch.setattr(history, "_signing_enabled", lambda: signed)
+    ag.rewrite_commits(
+        [
+            {"sha": shas[0], "subject": "feat: first updated", "body": ""},
+            {"sha": shas[1], "subject": "feat: second updated", "body": "it's \"$HOME\""},
+        ]
+    )
+
+    assert log("%T") == trees
+    assert log("%s") == ["feat: first updated", "feat: second updated"]
+    assert 'it\'s "$HOME"' in log("%b")
+    # The fast-import scratch ref is never left behind.
+    assert ag.run(["git", "for-each-ref", "refs/auto-git/"]) == ""
+
+
+def test_is_worktree_clean_counts_untracked(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, ".gitignore", "*.log\n")
+    write_file(repo, "file.txt", "one")
+    git("add .gitignore file.txt")
+    git('commit -m "feat: one"')
+
+    monkeypatch.chdir(repo)
+    write_file(repo, "debug.log", "ignored")
+    assert ag.is_worktree_clean() is True
+
+    # `reset --hard` would overwrite an untracked file the target commit has.
+    write_file(repo, "scratch.txt", "untracked")
+    assert ag.is_worktree_clean() is False
+    os.remove(repo / "scratch.txt")
+
+    write_file(repo, "file.txt", "two")
+    assert ag.is_worktree_clean() is False
+    with pytest.raises(RuntimeError, match="not clean"):
+        ag.rewrite_commits([])
+
+
+def test_read_commit_returns_tree_and_parents(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    for content in ("first", "second"):
+        write_file(repo, "file.txt", content)
+        git("add file.txt")
+        git(f'commit -m "feat: {content}"')
+
+    def rev(fmt, ref="HEAD"):
+        return subprocess.check_output(
+            ["git", "-C", str(repo), "show", "-s", f"--format={fmt}", ref], text=True
+        ).strip()
+
+    monkeypatch.chdir(repo)
+    assert ag.read_commit("HEAD") == {"tree": rev("%T"), "parents": [rev("%P")]}
+    assert ag.read_commit(rev("%P"))["parents"] == []
+    with pytest.raises(RuntimeError):
+        ag.read_commit("does-not-exist")
+
+
+def test_get_diff_runs_staged_unstaged_and_untracked(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, "a.py", "one\n")
+    git("add a.py")
+    git('commit -m "feat: a"')
+    write_file(repo, "a.py", "two\n")
+    git("add a.py")
+    write_file(repo, "a.py", "three\n")
+    write_file(repo, "new.py", "fresh\n")
+
+    monkeypatch.chdir(repo)
+    status = ag.get_status()
+    assert status == {"staged": ["a.py"], "unstaged": ["a.py"], "untracked": ["new.py"]}
+    index_before = (repo / ".git" / "index").read_bytes()
+
+    diff = ag.get_diff(
+        ["a.py", "new.py"], staged=True, unstaged=True, untracked_files=status["untracked"]
+    )
+    # Staged and unstaged changes come from one `git diff HEAD`: the net change.
+    assert "-one\n+three" in diff and "+two" not in diff
+    assert "new file mode" in diff and "+fresh" in diff
+    assert ag.get_diff(["a.py"], staged=True).count("+two") == 1
+    # Untracked files are diffed via intent-to-add entries in a scratch index.
+    assert (repo / ".git" / "index").read_bytes() == index_before
+    assert ag.get_status() == status
+
+
+def test_get_diff_keeps_crlf_line_endings(monkeypatch, tmp_git_repo):
+    from auto_git.git import diff as git_diff
+
+    repo, git = tmp_git_repo
+    (repo / "win.txt").write_bytes(b"one\r\n")
+    git("add win.txt")
+    git('commit -m "feat: win"')
+    (repo / "win.txt").write_bytes(b"two\r\n")
+    (repo / "new.txt").write_bytes(b"fresh\r\nmore\r\n")
+
+    monkeypatch.chdir(repo)
+    assert "-one\r\n+two" in ag.get_diff(["win.txt"], unstaged=True)
+    # The `--no-index` fallback for untracked files decodes the same way.
+    assert "+fresh\r\n+more" in git_diff._diff_untracked("new.txt")
+
+
+def test_apply_commits_records_only_each_commits_paths(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, "base.txt", "base")
+    git("add base.txt")
+    git('commit -m "chore: base"')
+    for name in ("a.txt", "b.txt", "other.txt"):
+        write_file(repo, name, name)
+    git("add other.txt")
+
+    monkeypatch.chdir(repo)
+    ag.apply_commits(
+        [
+            {"type": "feat", "title": "add a", "files": ["a.txt"]},
+            {"type": "feat", "title": "add b", "files": ["b.txt"]},
+        ]
+    )
+
+    def files_in(rev):
+        return subprocess.check_output(
+            ["git", "-C", str(repo), "show", "--name-only", "--format=", rev], text=True
+        ).split()
+
+    assert files_in("HEAD~1") == ["a.txt"]
+    assert files_in("HEAD") == ["b.txt"]
+    assert ag.get_status()["staged"] == ["other.txt"]
+
+
+def test_get_diff_reuses_result_until_content_changes(monkeypatch, tmp_git_repo, write_file):
+    from auto_git.git import diff as git_diff
+
+    repo, git = tmp_git_repo
+    write_file(repo, "a.py", "one\n")
+    git("add a.py")
+    git('commit -m "feat: a"')
+    write_file(repo, "a.py", "two\n")
+
+    monkeypatch.chdir(repo)
+    git_diff.clear_diff_cache()
+    calls = []
+    real_run_parallel = git_diff.run_parallel
+    monkeypatch.setattr(
+        git_diff,
+        "run_parallel",
+        lambda cmds, **kw: calls.append(cmds) or real_run_parallel(cmds, **kw),
+    )
+
+    first = ag.get_diff(["a.py"], unstaged=True)
+    assert ag.get_diff(["a.py"], unstaged=True) == first
+    assert len(calls) == 1
+
+    write_file(repo, "a.py", "three!\n")
+    assert "+three!" in ag.get_diff(["a.py"], unstaged=True)
+    assert len(calls) == 2
+
+
+def test_lint_reports_bad_subjects(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    for idx, subject in enumerate(["feat: add a", "wip stuff"]):
+        write_file(repo, "file.txt", str(idx))
+        git("add file.txt")
+        git(f'commit -m "{subject}"')
+
+    monkeypatch.chdir(repo)
+    result = CliRunner().invoke(ag.cli, ["lint", "5"])
+
+    assert result.exit_code == 0
+    assert "  - wip stuff\n  - feat: add a\n" in result.output
+    assert "Errors:\n  - wip stuff:" in result.output
+
+
+def test_status_lists_staged_and_unstaged(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, "a.py", "one\n")
+    git("add a.py")
+    git('commit -m "feat: add a"')
+    write_file(repo, "a.py", "two\n")
+    write_file(repo, "b.py", "new\n")
+    git("add b.py")
+
+    monkeypatch.chdir(repo)
+    result = CliRunner().invoke(ag.cli, ["status"])
+
+    assert result.exit_code == 0
+    assert result.output == "Staged:\nb.py\n\nUnstaged:\na.py\n"
+
+
+def test_get_diff_before_first_commit(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, "a.py", "one\n")
+    git("add a.py")
+    write_file(repo, "a.py", "two\n")
+
+    monkeypatch.chdir(repo)
+    diff = ag.get_diff(["a.py"], staged=True, unstaged=True)
+
+    assert "new file mode" in diff and "+two" in diff
+
+
+def test_non_utf8_paths_round_trip(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, "base.txt", "base")
+    git("add base.txt")
+    git('commit -m "chore: base"')
+    with open(os.path.join(os.fsencode(repo), b"caf\xe9.txt"), "wb") as fh:
+        fh.write(b"data\n")
+
+    monkeypatch.chdir(repo)
+    name = ag.get_status()["untracked"][0]
+    assert os.fsencode(name) == b"caf\xe9.txt"
+
+    ag.apply_commits([{"type": "feat", "title": "add file", "files": [name]}])
+    assert ag.get_status()["untracked"] == []
+
+
+def test_is_tracked_checks_the_index(monkeypatch, tmp_git_repo, write_file):
+    repo, git = tmp_git_repo
+    write_file(repo, "pkg/gone.py", "x\n")
+    git("add pkg/gone.py")
+    git('commit -m "feat: add gone"')
+    (repo / "pkg" / "gone.py").unlink()
+    write_file(repo, "pkg/new.py", "y\n")
+
+    monkeypatch.chdir(repo)
+    assert ag.is_tracked("pkg/gone.py") is True
+    assert ag.is_tracked("pkg/new.py") is False
+    assert ag.is_tracked("pkg") is True
+
+    monkeypatch.chdir(repo / "pkg")
+    assert ag.is_tracked("gone.py") is True
+
+
+@pytest.mark.parametrize("prefix_config", [None, "diff.noprefix true", "diff.mnemonicPrefix true"])
+def test_get_diff_by_file_splits_sections(monkeypatch, tmp_git_repo, write_file, prefix_config):
+    repo, git = tmp_git_repo
+    if prefix_config:
+        # User diff settings must not change the headers the split relies on.
+        git(f"config {prefix_config}")
+    write_file(repo, "a.py", "one\n")
+    write_file(repo, "b c.py", "one\n")
+    git("add .")
+    git('commit -m "feat: add files"')
+    write_file(repo, "a.py", "two\n")
+    write_file(repo, "b c.py", "two\n")
+    write_file(repo, "new.py", "fresh\n")
+
+    monkeypatch.chdir(repo)
+    args = (["a.py", "b c.py", "new.py"],)
+    kwargs = {"unstaged": True, "untracked_files": ["new.py"]}
+    sections = ag.get_diff_by_file(*args, **kwargs)
+
+    assert list(sections) == ["a.py", "b c.py", "new.py"]
+    assert all(s.startswith(f"diff --git a/{p} b/{p}\n") for p, s in sections.items())
+    assert "".join(sections.values()) == ag.get_diff(*args, **kwargs)
+
+
+def test_fix_no_wait_then_poll_applies_plan(monkeypatch, tmp_git_repo, write_file):
+    import importlib
+
+    cli_mod = importlib.import_module("auto_git.cli")
+
+    repo, git = tmp_git_repo
+    for idx in range(2):
+        write_file(repo, "file.txt", str(idx))
+        git("add file.txt")
+        git(f'commit -m "wip {idx}"')
+
+    plan = {"rewrittenCommits": [], "mergeStrategy": "squash"}
+    answers = iter([None, plan])
+    applied = []
+    monkeypatch.setattr(ag, "start_fix_batch", lambda commits: "batch_1")
+    monkeypatch.setattr(ag, "poll_fix_batch", lambda batch_id: next(answers))
+    monkeypatch.setattr(
+        cli_mod, "apply_fix_plan", lambda commits, p: applied.append((len(commits), p)) or "ok"
+    )
+    monkeypatch.chdir(repo)
+    runner = CliRunner()
+
+    result = runner.invoke(ag.cli, ["fix", "--no-wait"])
+    assert result.exit_code == 2 and "--no-wait requires --batch" in result.output
+
+    result = runner.invoke(ag.cli, ["fix", "--batch", "--no-wait", "--max-count", "2"])
+    assert "Submitted OpenAI batch batch_1" in result.output
+    assert runner.invoke(ag.cli, ["fix-poll"]).output.startswith("Batch batch_1 is still running")
+    assert applied == []
+
+    result = runner.invoke(ag.cli, ["fix-poll"])
+    assert result.exit_code == 0
+    assert applied == [(2, plan)]
+    assert runner.invoke(ag.cli, ["fix-poll"]).output == "No pending fix batch.\n"
+
+
+def test_fix_poll_keeps_pending_batch_on_transient_errors(monkeypatch, tmp_git_repo):
+    from auto_git.ai.batch import BatchFailedError
+
+    repo, git = tmp_git_repo
+    git('commit --allow-empty -m "wip"')
+    monkeypatch.chdir(repo)
+    monkeypatch.setattr(ag, "start_fix_batch", lambda commits: "batch_1")
+    runner = CliRunner()
+    runner.invoke(ag.cli, ["fix", "--batch", "--no-wait", "--max-count", "1"])
+
+    def flaky(batch_id):
+        raise ConnectionError("connection reset")
+
+    monkeypatch.setattr(ag, "poll_fix_batch", flaky)
+    result = runner.invoke(ag.cli, ["fix-poll"])
+    assert "run `fix-poll` again" in result.output
+
+    def failed(batch_id):
+        raise BatchFailedError("OpenAI batch batch_1 ended with status expired")
+
+    monkeypatch.setattr(ag, "poll_fix_batch", failed)
+    result = runner.invoke(ag.cli, ["fix-poll"])
+    assert "ended with status expired" in result.output
+    assert runner.invoke(ag.cli, ["fix-poll"]).output == "No pending fix batch.\n"
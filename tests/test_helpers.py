@@ -1,25 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+from functools import partial
 from types import SimpleNamespace
 
 import pytest
 
 import auto_git as ag
 
-
-def test_lint_commit_dict_valid():
-    subject = ag.lint_commit_dict(
-        {"type": "feat", "title": "add thing", "body": "desc", "files": ["a.py"]}
-    )
-    assert subject == "feat: add thing"
-
-
-def test_lint_commit_dict_invalid_type():
-    with pytest.raises(ValueError):
-        ag.lint_commit_dict({"type": "oops", "title": "bad", "files": ["a.py"]})
+LINT_CASES = (
+    ({"type": "feat", "title": "add thing", "body": "desc", "files": ["a.py"]}, "feat: add thing"),
+    ({"type": "oops", "title": "bad", "files": ["a.py"]}, ValueError),
+    ({"type": "feat", "title": "missing files", "files": []}, ValueError),
+)
 
 
-def test_lint_commit_dict_requires_files():
-    with pytest.raises(ValueError):
-        ag.lint_commit_dict({"type": "feat", "title": "missing files", "files": []})
+@pytest.mark.parametrize("commit, expected", LINT_CASES, ids=["valid", "bad-type", "no-files"])
+def test_lint_commit_dict(commit, expected):
+    if isinstance(expected, type) and issubclass(expected, Exception):
+        with pytest.raises(expected):
+            ag.lint_commit_dict(commit)
+    else:
+        assert ag.lint_commit_dict(commit) == expected
 
 
 def test_lint_git_commit_subject_validation():
@@ -28,19 +31,205 @@ def test_lint_git_commit_subject_validation():
         ag.lint_git_commit_subject("bad subject")
 
 
-def test_parse_json_from_openai_response_handles_fence():
-    raw = "Response:\\n```json\\n[{\"key\": \"value\"}]\\n```"
-    parsed = ag.parse_json_from_openai_response(raw)
-    assert parsed == [{"key": "value"}]
+@pytest.mark.parametrize(
+    "subject, expected",
+    [
+        ("feat: ok", True),
+        ("fix(api): ok", True),
+        ("feat(a: b): c", True),
+        ("feat(): x", False),
+        ("feat(scope):", False),
+        ("feat:x", False),
+        ("feature: x", False),
+        ("docs: line\n", True),
+        ("docs: two\nlines", False),
+        ("chore(deps)(x): y", True),
+    ],
+)
+def test_lint_git_commit_subject_accepts_conventional_subjects(subject, expected):
+    try:
+        ag.lint_git_commit_subject(subject)
+        accepted = True
+    except ValueError:
+        accepted = False
+    assert accepted == expected
+
+
+# Shapes model replies actually come back in, built once for the parametrized test.
+FENCE_CASES = (
+    ("Response:\\n```json\\n[{\"key\": \"value\"}]\\n```", [{"key": "value"}]),
+    ("```JSON\n{}\n```", {}),
+    ("Here:\n```\n{\"a\": 1}\n```", {"a": 1}),
+    ("```json\n\n[{\"k\": 1}]\n\n```", [{"k": 1}]),
+    ("```json\n{\"a\": 1}", {"a": 1}),
+    ("{\"a\": 1}", {"a": 1}),
+    ("Sure! [1, 2] hope this helps", [1, 2]),
+)
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    FENCE_CASES,
+    ids=[
+        "escaped-newlines",
+        "uppercase",
+        "bare-fence",
+        "blank-lines",
+        "unclosed",
+        "plain",
+        "prose",
+    ],
+)
+def test_parse_json_from_openai_response_handles_fence(raw, expected):
+    assert ag.parse_json_from_openai_response(raw) == expected
 
 
-def test_format_commit_preview():
-    preview = ag.format_commit_preview(
-        [
-            {"type": "feat", "title": "add api", "body": "desc", "files": ["a.py"]},
-            {"type": "fix", "title": "patch bug", "files": ["b.py"]},
-        ]
+def test_compress_diff_drops_lockfiles_and_truncates_hunks():
+    long_hunk = "@@ -1,300 +1,300 @@\n" + "".join(f"+line {i}\n" for i in range(300))
+    diff = (
+        "diff --git a/package-lock.json b/package-lock.json\n"
+        "@@ -1 +1 @@\n-old\n+new\n"
+        "diff --git a/src/app.py b/src/app.py\n" + long_hunk
+    )
+
+    compressed = ag.compress_diff(diff)
+
+    assert "diff --git a/package-lock.json b/package-lock.json\n[generated" in compressed
+    assert "+new" not in compressed
+    assert "+line 198\n" in compressed
+    assert "+line 250" not in compressed
+    assert "[... truncated ...]" in compressed
+    assert ag.compress_diff("not a diff") == "not a diff"
+
+    binary = (
+        "diff --git a/logo.png b/logo.png\n"
+        "index 1..2 100644\n"
+        "Binary files a/logo.png and b/logo.png differ\n"
+    )
+    assert ag.compress_diff(binary).endswith("[binary file changed]\n")
+
+
+def test_load_env_file_parses_once(tmp_path):
+    from auto_git.ai import client
+
+    env = tmp_path / ".env"
+    env.write_text('# comment\n\n  OPEN_AI_API_KEY = "sk-test"\r\nOTHER=1\nnoise\nOTHER=2\n')
+    assert client._load_env_file(str(env)) == {"OPEN_AI_API_KEY": "sk-test", "OTHER": "1"}
+
+    env.write_text("OPEN_AI_API_KEY=changed\n")
+    assert client._load_env_file(str(env))["OPEN_AI_API_KEY"] == "sk-test"
+    client._load_env_file.cache_clear()
+
+
+def test_ask_openai_for_commits_plans_large_diffs_in_chunks(monkeypatch):
+    from auto_git.ai import commits as ai_commits
+
+    diff = "".join(
+        f"diff --git a/{name} b/{name}\n@@ -0,0 +1 @@\n+{'x' * 40}\n" for name in "abc"
+    )
+    calls = []
+
+    def fake_chunk(files, chunk_diff, message=None):
+        calls.append(files)
+        # Every chunk also claims "a"; only the first claim should survive.
+        return [{"type": "feat", "title": f"add {f}", "files": [f, "a"]} for f in files]
+
+    monkeypatch.setattr(ai_commits, "COMMIT_PROMPT_MAX_TOKENS", 40)
+    monkeypatch.setattr(ai_commits, "_ask_commits_chunk", fake_chunk)
+
+    result = ag.ask_openai_for_commits(["extra", "a", "b", "c"], diff)
+
+    assert calls == [["extra", "a", "b"], ["c"]]
+    assert [c["files"] for c in result] == [["extra", "a"], ["b"], ["c"]]
+
+
+@pytest.mark.parametrize(
+    "path, diff_body, expected",
+    [
+        ("yarn.lock", "-a@1\n+a@2\n", ("chore", "update yarn.lock")),
+        ("CHANGELOG.md", "+- fix a bug\n", ("docs", "update CHANGELOG.md")),
+        (
+            "package.json",
+            '-  "version": "1.2.3",\n+  "version": "1.2.4",\n',
+            ("chore", "bump version to 1.2.4"),
+        ),
+        ("src/app.py", "-x = 1  \n+x = 1\n", ("style", "fix whitespace in app.py")),
+        ("src/app.py", "-x = 1\n+x = 2\n", None),
+        # Reordered lines are a semantic change, not a whitespace fix.
+        ("src/app.py", "-x = 1\n-y = x + 1\n+y = x + 1\n+x = 1\n", None),
+        # Indentation and inner spacing are not cosmetic.
+        ("src/app.py", "-    launch()\n+launch()\n", None),
+        ("src/app.py", '-q = "drop table"\n+q = "droptable"\n', None),
+        ("src/app.py", "-x = 1\r\n+x = 1\n", ("style", "fix whitespace in app.py")),
+    ],
+)
+def test_plan_trivial_commit(path, diff_body, expected):
+    from auto_git.ai.heuristics import plan_trivial_commit
+
+    diff = f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n@@ -1 +1 @@\n{diff_body}"
+    plan = plan_trivial_commit([path], diff)
+
+    if expected is None:
+        assert plan is None
+    else:
+        assert [(c["type"], c["title"], c["files"]) for c in plan] == [(*expected, [path])]
+        ag.lint_commit_dict(plan[0])
+    # Multi-file changes always go to the model.
+    assert plan_trivial_commit([path, "other"], diff) is None
+
+
+def test_batch_round_trip_with_fake_client():
+    from auto_git.ai import batch as ai_batch
+
+    uploaded = {}
+    statuses = iter(["in_progress", "completed"])
+    output_line = {
+        "custom_id": "req-1",
+        "response": {
+            "status_code": 200,
+            "body": {
+                "output": [
+                    {"type": "message", "content": [{"type": "output_text", "text": '{"ok":1}'}]}
+                ]
+            },
+        },
+    }
+
+    def create_file(file, purpose):
+        uploaded["content"], uploaded["purpose"] = file[1], purpose
+        return SimpleNamespace(id="file-in")
+
+    client = SimpleNamespace(
+        files=SimpleNamespace(
+            create=create_file,
+            content=lambda file_id: SimpleNamespace(text=json.dumps(output_line) + "\n"),
+        ),
+        batches=SimpleNamespace(
+            create=lambda **kwargs: SimpleNamespace(id="batch-1"),
+            retrieve=lambda batch_id: SimpleNamespace(
+                id=batch_id, status=next(statuses), output_file_id="file-out"
+            ),
+        ),
     )
+
+    batch_id = ai_batch.submit_batch(client, [("req-1", "gpt-test", "hello")])
+    request = json.loads(uploaded["content"])
+    assert uploaded["purpose"] == "batch"
+    assert request["url"] == "/v1/responses"
+    assert request["body"] == {"model": "gpt-test", "input": "hello", "temperature": 0}
+
+    done = ai_batch.wait_for_batch(client, batch_id, poll_seconds=0)
+    assert ai_batch.read_batch_output(client, done) == {"req-1": '{"ok":1}'}
+
+
+PREVIEW_COMMITS = (
+    {"type": "feat", "title": "add api", "body": "desc", "files": ["a.py"]},
+    {"type": "fix", "title": "patch bug", "files": ["b.py"]},
+)
+
+
+def test_format_commit_preview():
+    preview = ag.format_commit_preview(PREVIEW_COMMITS)
     assert "1. feat: add api" in preview
     assert "files: a.py" in preview
     assert "2. fix: patch bug" in preview
@@ -59,88 +248,451 @@ def test_get_origin_repo_slug(monkeypatch, remote, expected):
     assert ag.get_origin_repo_slug() == expected
 
 
-def test_get_diff_commands():
-    diff_cmds = ag.get_diff(["a.py", "b.py"], staged=True, unstaged=True)
-    assert "git diff --cached -- a.py b.py" in diff_cmds
-    assert "git diff -- a.py b.py" in diff_cmds
+def test_stream_records_splits_across_chunks():
+    argv = [sys.executable, "-c", "import sys; sys.stdout.write('\\x1eone\\x1etwo\\x1ethree')"]
+    assert list(ag.stream_records(argv, chunk_size=2)) == ["one", "two", "three"]
+    # A multi-byte separator split across two reads is still found.
+    argv = [sys.executable, "-c", "import sys; sys.stdout.write('one--two--' + 'x' * 50)"]
+    assert list(ag.stream_records(argv, sep=b"--", chunk_size=4)) == ["one", "two", "x" * 50]
+
+    failing = [sys.executable, "-c", "import sys; sys.exit(3)"]
+    with pytest.raises(subprocess.CalledProcessError):
+        list(ag.stream_records(failing))
+
+
+def test_run_keeps_carriage_returns():
+    argv = [sys.executable, "-c", "import sys; sys.stdout.buffer.write(b'a\\r\\nb\\rc\\0d\\re')"]
+    assert ag.run(argv) == "a\r\nb\rc\0d\re"
+
+
+def test_run_string_commands_are_deprecated():
+    assert ag.run([sys.executable, "-c", "print('ok')"]) == "ok"
+    with pytest.warns(DeprecationWarning):
+        assert ag.run(f"{sys.executable} -c 'print(1)'") == "1"
+
+
+# ChangeHandler tests only pass paths around, so they need no real directory.
+TRACKED_PATH = "/repo/file.py"
+GIT_ADD_ALL = ("git", "add", "-A")
+
+
+class _Evt:
+    """Minimal watchdog event: the attributes ChangeHandler reads, without a __dict__."""
+
+    __slots__ = ("src_path", "is_directory", "event_type")
 
+    def __init__(self, src_path, is_directory=False, event_type="modified"):
+        self.src_path = src_path
+        self.is_directory = is_directory
+        self.event_type = event_type
 
-def test_change_handler_ignores_git(monkeypatch, tmp_path):
+
+def _no_changed_files(staged=False, unstaged=False, untracked=False, untracked_files=None):
+    return []
+
+
+@pytest.fixture
+def watcher_stubs(monkeypatch):
+    """
+    Stub the git and UI calls ChangeHandler makes; `run` argv tuples land in `calls`.
+
+    Nothing is ignored and nothing has changed unless a test overrides it.
+    """
+    stubs = SimpleNamespace(calls=set())
+    monkeypatch.setattr(ag, "is_git_ignored", lambda path, root=None: False)
+    monkeypatch.setattr(ag, "run", lambda cmd: stubs.calls.add(tuple(cmd)))
+    monkeypatch.setattr(ag, "display_spinning_animation", lambda *a, **k: None)
+    monkeypatch.setattr(ag, "get_changed_files", _no_changed_files)
+    return stubs
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        _Evt("src", is_directory=True),
+        _Evt("a.py", event_type="opened"),
+        _Evt("a.py", event_type="closed"),
+        _Evt(".git/index"),
+        _Evt(os.path.abspath(".git/HEAD")),
+    ],
+)
+def test_change_handler_skips_noise_events(monkeypatch, event):
     calls = []
     handler = ag.ChangeHandler(ignore_dirs=[".git"])
-    monkeypatch.setattr(ag, "is_git_ignored", lambda path: True)
-    monkeypatch.setattr(ag, "run", lambda cmd: calls.append(cmd))
-    monkeypatch.setattr(ag, "display_spinning_animation", lambda *a, **k: None)
-    event = SimpleNamespace(src_path=str(tmp_path / ".git" / "config"))
+    monkeypatch.setattr(ag, "is_git_ignored", lambda path, root=None: calls.append(path) or False)
+    monkeypatch.setattr(ag, "run", calls.append)
+
     handler.on_any_event(event)
     assert calls == []
 
 
-def test_change_handler_stages_when_not_ignored(monkeypatch, tmp_path):
-    calls = []
-    handler = ag.ChangeHandler(ignore_dirs=[], status_cooldown=0)
-    monkeypatch.setattr(ag, "is_git_ignored", lambda path: False)
-    monkeypatch.setattr(ag, "run", lambda cmd: calls.append(cmd))
-    monkeypatch.setattr(ag, "display_spinning_animation", lambda *a, **k: None)
+def test_change_handler_leaves_dependency_dirs_to_gitignore(monkeypatch):
+    checked = []
+    handler = ag.ChangeHandler(ignore_dirs=[".git"])
     monkeypatch.setattr(
-        ag,
-        "get_changed_files",
-        lambda staged=False, unstaged=False, untracked=False, untracked_files=None: [],
+        ag, "is_git_ignored", lambda path, root=None: checked.append(path) or path.endswith(".pyc")
+    )
+    monkeypatch.setattr(handler, "_process_pending", lambda: checked.append("run"))
+
+    handler.on_any_event(_Evt("pkg/__pycache__/m.pyc", event_type="created"))
+    assert checked == ["pkg/__pycache__/m.pyc"]
+    # A tracked (vendored) dependency file is a real change.
+    handler.on_any_event(_Evt("web/node_modules/x.js", event_type="created"))
+    assert checked[1:] == ["web/node_modules/x.js", "run"]
+
+
+def test_is_network_mount_uses_longest_mount_point(tmp_path):
+    from auto_git.watcher import is_network_mount
+
+    mounts = tmp_path / "mounts"
+    mounts.write_text(
+        "/dev/root / ext4 rw 0 0\n"
+        "server:/export /mnt/share nfs4 rw 0 0\n"
+        "/dev/sdb1 /mnt/share/local ext4 rw 0 0\n"
+    )
+    assert is_network_mount("/mnt/share/repo", mounts_file=str(mounts)) is True
+    assert is_network_mount("/mnt/share/local/repo", mounts_file=str(mounts)) is False
+    assert is_network_mount("/home/me/repo", mounts_file=str(mounts)) is False
+    assert is_network_mount("/", mounts_file=str(tmp_path / "missing")) is False
+
+
+def test_change_handler_ignore_dirs_match_whole_components(monkeypatch):
+    checked = []
+    handler = ag.ChangeHandler(ignore_dirs=[".git"])
+    monkeypatch.setattr(ag, "is_git_ignored", lambda path, root=None: checked.append(path) or True)
+
+    handler.on_any_event(_Evt(".github/workflows/ci.yml"))
+    assert checked == [".github/workflows/ci.yml"]
+
+
+class FakeTimer:
+    """Stand-in for threading.Timer that records itself instead of starting a thread."""
+
+    __slots__ = ("interval", "func", "daemon", "_alive", "_scheduled")
+
+    def __init__(self, scheduled, interval, func):
+        self.interval = interval
+        self.func = func
+        self._alive = False
+        self.daemon = False
+        self._scheduled = scheduled
+
+    def start(self):
+        self._alive = True
+        self._scheduled.append(self)
+
+    def is_alive(self):
+        return self._alive
+
+    def fire(self):
+        self._alive = False
+        self.func()
+
+
+def make_clock(t0=100.0):
+    """Return a `(clock, now)` pair; tests move time by assigning `now[0]`."""
+    now = [t0]
+    return (lambda: now[0]), now
+
+
+@pytest.mark.parametrize(
+    "ignored, interval, expect_add",
+    [
+        (True, 0, False),
+        (False, 0, True),
+        # Both events coalesce into one run, scheduled `interval` seconds out.
+        (False, 10, True),
+    ],
+)
+def test_change_handler_stages_changes(
+    monkeypatch, watcher_stubs, ignored, interval, expect_add
+):
+    scheduled = []
+    clock, now = make_clock()
+    handler = ag.ChangeHandler(
+        ignore_dirs=[".git"],
+        status_cooldown=0,
+        interval_seconds=interval,
+        clock=clock,
+        timer_factory=partial(FakeTimer, scheduled) if interval else None,
     )
-    event = SimpleNamespace(src_path=str(tmp_path / "file.py"))
+    monkeypatch.setattr(ag, "is_git_ignored", lambda path, root=None: ignored)
+
+    event = _Evt(TRACKED_PATH)
     handler.on_any_event(event)
-    assert any("git add -A" in c for c in calls)
+    if interval:
+        handler.on_any_event(event)
+        assert GIT_ADD_ALL not in watcher_stubs.calls
+        assert [t.interval for t in scheduled] == [pytest.approx(interval)]
+        now[0] += interval + 1
+        scheduled[0].fire()
 
+    assert (GIT_ADD_ALL in watcher_stubs.calls) is expect_add
 
-def test_change_handler_debounces_with_interval(monkeypatch, tmp_path):
-    calls = []
+
+def test_change_handler_backs_off_after_slow_runs(monkeypatch, watcher_stubs):
     scheduled = []
+    clock, now = make_clock()
+    handler = ag.ChangeHandler(
+        ignore_dirs=[],
+        status_cooldown=0,
+        interval_seconds=10,
+        clock=clock,
+        timer_factory=partial(FakeTimer, scheduled),
+    )
+    # Each run takes 20 s of (fake) time.
+    monkeypatch.setattr(ag, "run", lambda cmd: now.__setitem__(0, now[0] + 20))
+
+    handler.on_any_event(_Evt(TRACKED_PATH))
+    assert scheduled[-1].interval == 10
+    now[0] = 110.0
+    scheduled[-1].fire()
+    assert now[0] == 130.0
+
+    # The next window is stretched to 1.5x the slow run, not the 10 s interval.
+    handler.on_any_event(_Evt(TRACKED_PATH))
+    assert scheduled[-1].interval == pytest.approx(max(10, 1.5 * 20))
+
+
+def test_response_cache_round_trip_and_eviction(monkeypatch, tmp_path):
+    from auto_git.ai import cache
 
-    class FakeTimer:
-        def __init__(self, interval, func):
-            self.interval = interval
-            self.func = func
-            self._alive = False
-            self.daemon = False
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(cache, "RESPONSE_CACHE_MAX_ENTRIES", 2)
 
-        def start(self):
-            self._alive = True
-            scheduled.append(self)
+    assert cache.get(cache.make_key("m", "p1")) is None
+    for prompt in ("p1", "p2", "p3"):
+        cache.put(cache.make_key("m", prompt), f"answer {prompt}")
 
-        def is_alive(self):
-            return self._alive
+    assert cache.get(cache.make_key("m", "p3")) == "answer p3"
+    assert cache.get(cache.make_key("other", "p3")) is None
+    assert len(list(cache.get_cache_dir().glob("*.txt"))) == 2
 
-    now = [100.0]
+    # Entries past the TTL are treated as misses and dropped.
+    stale = cache.get_cache_dir() / f"{cache.make_key('m', 'p3')}.txt"
+    old = stale.stat().st_mtime - cache.RESPONSE_CACHE_TTL_SECONDS - 1
+    os.utime(stale, (old, old))
+    assert cache.get(cache.make_key("m", "p3")) is None
+    assert not stale.exists()
 
-    def clock():
-        return now[0]
+    assert cache.clear() == 1
+    assert list(cache.get_cache_dir().glob("*.txt")) == []
 
+    cache.set_enabled(False)
+    try:
+        cache.put(cache.make_key("m", "p4"), "answer p4")
+        assert list(cache.get_cache_dir().glob("*.txt")) == []
+    finally:
+        cache.set_enabled(True)
+
+
+def test_ask_openai_for_commits_requests_structured_output(monkeypatch, tmp_path):
+    from auto_git.ai import commits as ai_commits
+
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    seen = {}
+
+    def fake_stream(client, model, prompt, text_format=None):
+        seen["format"] = text_format
+        yield '{"commits":[{"type":"feat","title":"add a",'
+        yield '"body":"","files":["a.py"]}]}'
+
+    monkeypatch.setattr(ai_commits, "get_openai_client", lambda: object())
+    monkeypatch.setattr(ai_commits, "stream_response_text", fake_stream)
+
+    result = ag.ask_openai_for_commits(["a.py"], "diff")
+
+    assert result == [{"type": "feat", "title": "add a", "body": "", "files": ["a.py"]}]
+    assert seen["format"]["type"] == "json_schema"
+    assert seen["format"]["schema"]["required"] == ["commits"]
+
+
+def test_iter_json_array_items_yields_elements_as_they_complete():
+    from auto_git.ai.client import iter_json_array_items
+
+    chunks = ["Sure:\n```json\n[", '{"a": 1', "}, ", '{"b": [2, ', "3]}", "]\n```"]
+    seen = []
+
+    def _feed():
+        for chunk in chunks:
+            seen.append(chunk)
+            yield chunk
+
+    items = iter_json_array_items(_feed())
+    assert next(items) == {"a": 1}
+    assert len(seen) == 3
+    assert list(items) == [{"b": [2, 3]}]
+    assert len(seen) == len(chunks)
+
+
+def test_change_handler_waits_for_quiet_period(watcher_stubs):
+    calls = watcher_stubs.calls
+    scheduled = []
+    clock, now = make_clock()
     handler = ag.ChangeHandler(
         ignore_dirs=[],
         status_cooldown=0,
-        interval_seconds=10,
+        debounce_seconds=0.5,
         clock=clock,
-        timer_factory=FakeTimer,
+        timer_factory=partial(FakeTimer, scheduled),
     )
-    monkeypatch.setattr(ag, "is_git_ignored", lambda path: False)
-    monkeypatch.setattr(ag, "run", lambda cmd: calls.append(cmd))
-    monkeypatch.setattr(ag, "display_spinning_animation", lambda *a, **k: None)
+
+    event = _Evt(TRACKED_PATH)
+    handler.on_any_event(event)
+    now[0] = 100.4
+    handler.on_any_event(event)
+
+    # The first timer fires while events are still arriving and is pushed back.
+    scheduled[0].fire()
+    assert not calls
+    assert scheduled[-1].interval == pytest.approx(0.5)
+
+    now[0] = 101.0
+    scheduled[-1].fire()
+    assert GIT_ADD_ALL in calls
+
+
+def test_spinner_shows_progress_detail(monkeypatch, capsys):
+    import threading
+
+    from auto_git import ui
+
+    monkeypatch.setattr(sys.stdout, "isatty", lambda: True)
+    shown = threading.Event()
+    real_echo = ui.click.echo
+
+    def echo(text="", nl=True):
+        real_echo(text, nl=nl)
+        if "(3 chars received)" in text:
+            shown.set()
+
+    monkeypatch.setattr(ui.click, "echo", echo)
+    with ui.spinner("Working") as update:
+        update("(3 chars received)")
+        assert shown.wait(2)
+
+    assert capsys.readouterr().out.endswith("\rWorking" + " " * 21 + "\n")
+
+
+def test_ask_openai_for_commits_reuses_unchanged_file_plans(monkeypatch):
+    from auto_git.ai import commits as ai_commits
+
+    def section(name, line):
+        return f"diff --git a/{name} b/{name}\n@@ -1 +1 @@\n-old\n+{line}\n"
+
+    asked = []
+
+    def fake_chunk(files, diff, message=None):
+        asked.append((files, diff))
+        return [{"type": "fix", "title": f"touch {f}", "body": "", "files": [f]} for f in files]
+
+    monkeypatch.setattr(ai_commits, "_ask_commits_chunk", fake_chunk)
+
+    ag.ask_openai_for_commits(["a.py", "b.py"], section("a.py", "one") + section("b.py", "one"))
+    result = ag.ask_openai_for_commits(
+        ["a.py", "b.py"], section("a.py", "one") + section("b.py", "two")
+    )
+
+    # Only b.py changed since the first plan, so only its diff goes to the model.
+    assert asked[-1] == (["b.py"], section("b.py", "two"))
+    assert [(c["title"], c["files"]) for c in result] == [
+        ("touch a.py", ["a.py"]),
+        ("touch b.py", ["b.py"]),
+    ]
+
+
+def test_split_diff_by_file_unquotes_quoted_paths():
+    from auto_git.ai.diffs import split_diff_by_file
+
+    quoted = 'diff --git "a/caf\\303\\251.py" "b/caf\\303\\251.py"\n@@ -1 +1 @@\n-a\n+b\n'
+    tabbed = 'diff --git "a/x\\ty.py" "b/x\\ty.py"\n@@ -1 +1 @@\n-a\n+b\n'
+    plain = "diff --git a/b c.py b/b c.py\n@@ -1 +1 @@\n-a\n+b\n"
+
+    sections = split_diff_by_file(quoted + tabbed + plain)
+
+    assert sections == {"caf\u00e9.py": quoted, "x\ty.py": tabbed, "b c.py": plain}
+
+
+def test_ask_openai_for_amendments_splits_long_histories(monkeypatch):
+    from auto_git.ai import commits as ai_commits
+
+    commits = [{"sha": f"s{i}", "subject": "wip", "body": ""} for i in range(5)]
+    asked = []
+
+    def fake_chunk(chunk, batch=False, message=None):
+        asked.append([c["sha"] for c in chunk])
+        return [{"sha": c["sha"], "subject": "chore: tidy"} for c in chunk]
+
+    monkeypatch.setattr(ai_commits, "AMENDMENT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(ai_commits, "_ask_amendments_chunk", fake_chunk)
+
+    result = ag.ask_openai_for_amendments(commits)
+
+    assert sorted(asked) == [["s0", "s1"], ["s2", "s3"], ["s4"]]
+    assert [a["sha"] for a in result] == [c["sha"] for c in commits]
+
+
+def test_fix_prompt_summarizes_oversized_diffs(monkeypatch):
+    from auto_git.ai import commits as ai_commits
+
+    diff = (
+        "diff --git a/a.py b/a.py\n--- a/a.py\n+++ b/a.py\n"
+        "@@ -1 +1,2 @@\n-old\n+new\n+more\n@@ -9 +10 @@\n-x\n+y\n"
+    )
+    commits = [{"hash": "abc", "message": "wip", "diff": diff}]
+
+    assert json.loads(ai_commits._fix_prompt(commits).splitlines()[-1])[0]["diff"] == diff
+
+    monkeypatch.setattr(ai_commits, "FIX_FULL_DIFF_MAX_CHARS", 10)
+    prompt = ai_commits._fix_prompt(commits)
+
+    assert "too large to include" in prompt
+    assert json.loads(prompt.splitlines()[-1])[0]["diff"] == "a.py: +3 -2 (2 hunks)"
+
+
+def test_change_handler_prints_commit_log_off_the_processing_path(monkeypatch, watcher_stubs):
+    import threading
+
+    printed = threading.Event()
+    applied = []
+    handler = ag.ChangeHandler(ignore_dirs=[], status_cooldown=0)
+    monkeypatch.setattr(ag, "get_changed_files", lambda **kwargs: ["file.py"])
+    monkeypatch.setattr(ag, "get_diff", lambda files, **kwargs: "diff")
+    monkeypatch.setattr(ag, "ask_openai_for_commits", lambda files, diff: ["plan"])
     monkeypatch.setattr(
-        ag,
-        "get_changed_files",
-        lambda staged=False, unstaged=False, untracked=False, untracked_files=None: [],
+        ag, "apply_commits", lambda commits, show_log=True: applied.append(show_log) or ["s"]
     )
+    monkeypatch.setattr(ag, "print_commit_log", printed.set)
 
-    event = SimpleNamespace(src_path=str(tmp_path / "file.py"))
-    handler.on_any_event(event)
-    handler.on_any_event(event)  # should coalesce into same scheduled run
+    handler.on_any_event(_Evt(TRACKED_PATH))
+
+    assert applied == [False]
+    assert printed.wait(5)
+
+
+def test_change_handler_coalesces_event_burst_into_one_plan(monkeypatch, watcher_stubs):
+    scheduled = []
+    asked = []
+    clock, now = make_clock(0.0)
+    handler = ag.ChangeHandler(
+        ignore_dirs=[],
+        status_cooldown=0,
+        debounce_seconds=0.5,
+        clock=clock,
+        timer_factory=partial(FakeTimer, scheduled),
+    )
+    monkeypatch.setattr(ag, "get_changed_files", lambda **kwargs: ["file.py"])
+    monkeypatch.setattr(ag, "get_diff", lambda files, **kwargs: "diff")
+    monkeypatch.setattr(ag, "ask_openai_for_commits", lambda files, diff: asked.append(files))
+    monkeypatch.setattr(ag, "apply_commits", lambda commits, show_log=True: [])
 
-    assert not any("git add -A" in c for c in calls)
-    assert len(scheduled) == 1
-    assert int(scheduled[0].interval) == 10
+    # 100 events within 10 ms.
+    for i in range(100):
+        now[0] = i * 0.0001
+        handler.on_any_event(_Evt(f"/repo/f{i}.py"))
 
-    # Fire the scheduled timer after the interval.
-    now[0] = 111.0
-    scheduled[0].func()
-    assert any("git add -A" in c for c in calls)
+    now[0] = 1.0
+    while scheduled:
+        scheduled.pop(0).fire()
 
+    assert len(asked) == 1